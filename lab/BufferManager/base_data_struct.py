@@ -7,7 +7,89 @@ This file contains the fundamental data structures used throughout the lab.
 """
 
 import struct
-from typing import List, Optional
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+
+# Pre-compiled codec for one 28-byte order record (7 unsigned ints), so the
+# format string is parsed only once. The on-disk format is always
+# little-endian, whatever machine wrote the file.
+_ORDER_STRUCT = struct.Struct('<IIIIIII')
+
+# In memory, page records are native-order uint32 slots (array('I') and
+# memoryview.cast('I') are native). The page codec below converts between
+# the two; on little-endian hosts that conversion is a no-op.
+_SLOT_STRUCT = struct.Struct('=IIIIIII')
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+# Column layout of a record: position of each field among its 4-byte slots.
+ORDER_FIELDS = ('order_id', 'customer_id', 'product_id', 'quantity',
+                'price_cents', 'order_date', 'region')
+_FIELD_INDEX = {name: i for i, name in enumerate(ORDER_FIELDS)}
+_SLOTS_PER_RECORD = _ORDER_STRUCT.size // 4
+
+# Page layout: [uint32 n_records][record 0][record 1]...[zone map footer]
+# The header slot tells how many records follow, so decoding a page
+# never has to probe slots for empty records.
+_HEADER_SLOTS = 1
+
+# Zone map footer (last 32 bytes of the page): a summary of the records that
+# lets a scan rule out a whole page without looking at any record.
+# Slots: min/max customer_id, min/max order_date, region bitmap
+# (bit region % 32), 3 reserved.
+_FOOTER_SLOTS = 8
+_ZM_MIN_CUSTOMER, _ZM_MAX_CUSTOMER, _ZM_MIN_DATE, _ZM_MAX_DATE, _ZM_REGIONS = range(5)
+_UINT32_MAX = 0xFFFFFFFF
+
+assert array('I').itemsize == 4, "array('I') must be 32-bit on this platform"
+
+
+# Page codec. On disk a page is nothing but its record slots, so encoding
+# and decoding a whole page is a buffer view or one memcpy - there is no
+# per-record work left to speed up.
+
+def pack_page(records: Sequence[int], out=None, offset: int = 0) -> memoryview:
+    """
+    Encode the record slots of a page for disk storage.
+    
+    Args:
+        records: uint32 record slots of a page (array or memoryview)
+        out: Optional writable buffer to copy the encoded page into
+        offset: Byte offset in out at which the page starts
+        
+    Returns:
+        memoryview: The encoded bytes - a read-only view of records when out
+        is None (no copy), otherwise the region of out that was written
+    """
+    if not _NATIVE_LITTLE_ENDIAN:
+        records = array('I', records)
+        records.byteswap()
+    view = memoryview(records).cast('B')
+    if out is None:
+        return view.toreadonly()
+    dest = memoryview(out)[offset:offset + len(view)]
+    dest[:] = view
+    return dest
+
+
+def unpack_page(data) -> Sequence[int]:
+    """
+    Decode page bytes read from disk into uint32 record slots.
+    
+    Args:
+        data: Page bytes (bytes, bytearray, mmap slice, ...)
+        
+    Returns:
+        Sequence[int]: uint32 memoryview over data (no copy), or a byteswapped
+        array copy on big-endian hosts
+    """
+    if not _NATIVE_LITTLE_ENDIAN:
+        records = array('I')
+        records.frombytes(data)
+        records.byteswap()
+        return records
+    return memoryview(data).cast('I')
 
 
 class Config:
@@ -26,17 +108,22 @@ class Order:
     Represents a single order record in our e-commerce database.
     
     This is a fixed-size record that can be efficiently stored and retrieved from disk.
-    Each order takes exactly 32 bytes when serialized.
+    Each order takes exactly 28 bytes when serialized, with no padding:
+    every byte read from disk is useful data.
     """
-    RECORD_SIZE = 32  # 8 integers × 4 bytes each
+    RECORD_SIZE = 28  # 7 integers × 4 bytes each
+    
+    # Fixed attribute set: no per-instance __dict__, so each Order is much
+    # smaller and attribute access is a direct slot lookup
+    __slots__ = ORDER_FIELDS
     
     def __init__(self, order_id: int, customer_id: int, product_id: int, 
-                 quantity: int, price: float, order_date: int, region: int):
+                 quantity: int, price_cents: int, order_date: int, region: int):
         self.order_id = order_id
         self.customer_id = customer_id 
         self.product_id = product_id
         self.quantity = quantity
-        self.price = price  # Will be stored as cents (integer)
+        self.price_cents = price_cents  # Integer cents, exactly as stored on disk
         self.order_date = order_date  # Days since epoch
         self.region = region
     
@@ -45,17 +132,16 @@ class Order:
         Serialize order to fixed-size byte representation for disk storage.
         
         Returns:
-            bytes: 32-byte representation of the order
-        """
-        return struct.pack('IIIIIIII', 
-                          self.order_id, 
-                          self.customer_id, 
-                          self.product_id,
-                          self.quantity, 
-                          int(self.price * 100),  # Store price as cents to avoid floats
-                          self.order_date, 
-                          self.region, 
-                          0)  # Padding to reach 32 bytes
+            bytes: 28-byte representation of the order
+        """
+        return _ORDER_STRUCT.pack(
+            self.order_id, 
+            self.customer_id, 
+            self.product_id,
+            self.quantity, 
+            self.price_cents,
+            self.order_date, 
+            self.region)
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'Order':
@@ -63,7 +149,7 @@ class Order:
         Deserialize order from byte representation.
         
         Args:
-            data: 32-byte data from disk
+            data: 28-byte data from disk
             
         Returns:
             Order: Reconstructed order object
@@ -74,18 +160,22 @@ class Order:
         if len(data) < cls.RECORD_SIZE:
             raise ValueError(f"Data too short: expected {cls.RECORD_SIZE}, got {len(data)}")
         
-        fields = struct.unpack('IIIIIIII', data[:cls.RECORD_SIZE])
+        fields = _ORDER_STRUCT.unpack(data[:cls.RECORD_SIZE])
         return cls(
             order_id=fields[0],
             customer_id=fields[1], 
             product_id=fields[2], 
             quantity=fields[3],
-            price=fields[4] / 100.0,  # Convert back from cents
+            price_cents=fields[4],
             order_date=fields[5], 
             region=fields[6]
-            # fields[7] is padding, ignored
         )
     
+    @property
+    def price(self) -> float:
+        """Price in dollars (for display; aggregate price_cents instead)"""
+        return self.price_cents / 100
+    
     def __str__(self) -> str:
         return (f"Order(id={self.order_id}, customer={self.customer_id}, "
                 f"product={self.product_id}, price=${self.price:.2f})")
@@ -97,9 +187,30 @@ class DiskPage:
     
     Pages are the unit of I/O between memory and disk. Each page is 4kB (typical database page size) and contains multiple order records. 
     This matches how real database systems organize data.
+    
+    In memory the page keeps its records exactly as they are laid out on disk:
+    one flat array of unsigned 32-bit ints - a 1-slot header holding the
+    number of records, then 7 slots per record, then an 8-slot zone map.
+    Scans can read a single field of every record with column(), skip
+    pages with the may_contain_*() checks, and Order objects are only built
+    when somebody asks for the orders list.
+    
+    Pages read from disk do not copy the data: records is a read-only
+    memoryview over the buffer returned by the read. The first add_order()
+    on such a page copies it into a writable array.
     """
     PAGE_SIZE = Config.PAGE_SIZE  # 4kB pages - standard database page size
-    RECORDS_PER_PAGE = PAGE_SIZE // Order.RECORD_SIZE  # 128 records per page
+    HEADER_SIZE = _HEADER_SLOTS * 4  # n_records (uint32)
+    FOOTER_SIZE = _FOOTER_SLOTS * 4  # Zone map
+    RECORDS_PER_PAGE = (PAGE_SIZE - HEADER_SIZE - FOOTER_SIZE) // Order.RECORD_SIZE  # 145 records, page fully used
+    _FOOTER = (PAGE_SIZE - FOOTER_SIZE) // 4  # Slot index of the zone map
+    
+    # Slots of an empty page: n_records = 0 and an empty zone map (min > max, no region bits)
+    _EMPTY_RECORDS = array('I', bytes(PAGE_SIZE))
+    _EMPTY_RECORDS[_FOOTER + _ZM_MIN_CUSTOMER] = _UINT32_MAX
+    _EMPTY_RECORDS[_FOOTER + _ZM_MIN_DATE] = _UINT32_MAX
+    
+    __slots__ = ('page_id', 'records', 'num_records', '_orders', '_columns')
     
     def __init__(self, page_id: int):
         """
@@ -109,7 +220,70 @@ class DiskPage:
             page_id: Unique identifier for this page
         """
         self.page_id = page_id
-        self.orders: List[Order] = []
+        self.records = array('I', self._EMPTY_RECORDS)
+        self.num_records = 0
+        self._orders: Optional[List[Order]] = None  # Cached row view
+        self._columns: Dict[str, List[int]] = {}  # Cached column() results
+    
+    def reset(self, page_id: int):
+        """
+        Empty this page and reuse it as a new page, without allocating a new buffer.
+        
+        Meant for loops that fill and write one page after another (bulk
+        loading). Only reset a page nobody else holds on to, e.g. not one that
+        sits in a buffer pool.
+        
+        Args:
+            page_id: ID the page takes from now on
+        """
+        self.page_id = page_id
+        if isinstance(self.records, array):
+            self.records[:] = self._EMPTY_RECORDS  # In-place copy, same size
+        else:
+            self.records = array('I', self._EMPTY_RECORDS)  # Was a read-only view
+        self.num_records = 0
+        self._orders = None
+        self._columns = {}
+    
+    @property
+    def orders(self) -> List[Order]:
+        """
+        Orders stored in this page, materialized on first access.
+        
+        The list is a read-only view: use add_order() to modify the page.
+        """
+        if self._orders is None:
+            self._orders = [
+                Order(order_id, customer_id, product_id, quantity,
+                      cents, order_date, region)
+                for (order_id, customer_id, product_id, quantity,
+                     cents, order_date, region)
+                in _SLOT_STRUCT.iter_unpack(
+                    self.records[_HEADER_SLOTS:_HEADER_SLOTS + self.num_records * _SLOTS_PER_RECORD])
+            ]
+        return self._orders
+    
+    def column(self, name: str) -> List[int]:
+        """
+        Get one field of every order in this page.
+        
+        The values are decoded from the record slots once and cached on the
+        page, so later scans of a page that stays in memory (e.g. in a buffer
+        pool) get a ready-made list.
+        
+        Args:
+            name: Field name from ORDER_FIELDS (e.g. 'customer_id', 'price_cents')
+            
+        Returns:
+            List[int]: Values of that field, one per order, in page order.
+            Treat it as read-only: use add_order() to modify the page.
+        """
+        values = self._columns.get(name)
+        if values is None:
+            start = _HEADER_SLOTS + _FIELD_INDEX[name]
+            values = self.records[start:_HEADER_SLOTS + self.num_records * _SLOTS_PER_RECORD:_SLOTS_PER_RECORD].tolist()
+            self._columns[name] = values
+        return values
     
     def add_order(self, order: Order) -> bool:
         """
@@ -121,33 +295,127 @@ class DiskPage:
         Returns:
             bool: True if order was added, False if page is full
         """
-        if len(self.orders) >= self.RECORDS_PER_PAGE:
+        if self.num_records >= self.RECORDS_PER_PAGE:
             return False
-        self.orders.append(order)
+        if not isinstance(self.records, array):
+            # Copy-on-write: detach from the read-only buffer we were loaded from
+            self.records = array('I', self.records.tobytes())
+        records = self.records
+        _SLOT_STRUCT.pack_into(records, self.HEADER_SIZE + self.num_records * Order.RECORD_SIZE,
+                               order.order_id,
+                               order.customer_id,
+                               order.product_id,
+                               order.quantity,
+                               order.price_cents,
+                               order.order_date,
+                               order.region)
+        self.num_records += 1
+        records[0] = self.num_records  # Keep the page header in sync
+        
+        # Widen the zone map to cover the new order
+        footer = self._FOOTER
+        customer_id = order.customer_id
+        if customer_id < records[footer + _ZM_MIN_CUSTOMER]:
+            records[footer + _ZM_MIN_CUSTOMER] = customer_id
+        if customer_id > records[footer + _ZM_MAX_CUSTOMER]:
+            records[footer + _ZM_MAX_CUSTOMER] = customer_id
+        order_date = order.order_date
+        if order_date < records[footer + _ZM_MIN_DATE]:
+            records[footer + _ZM_MIN_DATE] = order_date
+        if order_date > records[footer + _ZM_MAX_DATE]:
+            records[footer + _ZM_MAX_DATE] = order_date
+        records[footer + _ZM_REGIONS] |= 1 << (order.region % 32)
+        
+        self._orders = None
+        self._columns = {}
         return True
     
+    def may_contain_customer(self, customer_id: int) -> bool:
+        """
+        Zone map check: False means no order of this customer is in the page.
+        
+        True only means the page has to be scanned (customer_id is within
+        the page's min/max range).
+        """
+        footer = self._FOOTER
+        return (self.num_records > 0 and
+                self.records[footer + _ZM_MIN_CUSTOMER] <= customer_id <= self.records[footer + _ZM_MAX_CUSTOMER])
+    
+    def may_contain_date_range(self, start_date: int, end_date: int) -> bool:
+        """Zone map check: could any order be dated within [start_date, end_date]?"""
+        footer = self._FOOTER
+        return (self.num_records > 0 and
+                self.records[footer + _ZM_MIN_DATE] <= end_date and
+                start_date <= self.records[footer + _ZM_MAX_DATE])
+    
+    def may_contain_region(self, region: int) -> bool:
+        """Zone map check: could any order be from this region?"""
+        return bool(self.records[self._FOOTER + _ZM_REGIONS] >> (region % 32) & 1)
+    
     def is_full(self) -> bool:
         """Check if this page is full."""
-        return len(self.orders) >= self.RECORDS_PER_PAGE
+        return self.num_records >= self.RECORDS_PER_PAGE
     
     def to_bytes(self) -> bytes:
         """
         Serialize entire page to bytes for disk storage.
         
-        The page is padded with zeros to exactly PAGE_SIZE bytes.
+        The header and unused slots are always up to date, so the page is
+        written as-is.
         
         Returns:
             bytes: PAGE_SIZE bytes representing this page
         """
-        data = bytearray(self.PAGE_SIZE)
+        return pack_page(self.records).tobytes()
+    
+    @classmethod
+    def from_columns(cls, page_id: int, order_ids: Sequence[int], customer_ids: Sequence[int],
+                     product_ids: Sequence[int], quantities: Sequence[int], price_cents: Sequence[int],
+                     order_dates: Sequence[int], regions: Sequence[int]) -> 'DiskPage':
+        """
+        Build a page directly from one sequence per field, without Order objects.
+        
+        Each column is written into its strided slots in a single slice
+        assignment, which makes this the fast path for bulk loading.
+        
+        Args:
+            page_id: ID of this page
+            order_ids ... regions: Field values, in ORDER_FIELDS order, all of
+                the same length (at most RECORDS_PER_PAGE)
+            
+        Returns:
+            DiskPage: Page holding the given records, with header and zone map set
+            
+        Raises:
+            ValueError: If there are more records than fit in a page
+        """
+        num_records = len(order_ids)
+        if num_records > cls.RECORDS_PER_PAGE:
+            raise ValueError(f"{num_records} records do not fit in a page of {cls.RECORDS_PER_PAGE}")
+        
+        page = cls(page_id)
+        if num_records == 0:
+            return page
+        
+        records = page.records
+        end = _HEADER_SLOTS + num_records * _SLOTS_PER_RECORD
+        columns = (order_ids, customer_ids, product_ids, quantities, price_cents, order_dates, regions)
+        for field, values in enumerate(columns):
+            records[_HEADER_SLOTS + field:end:_SLOTS_PER_RECORD] = array('I', values)
+        records[0] = num_records
         
-        # Write each order to its position in the page
-        for i, order in enumerate(self.orders):
-            start_offset = i * Order.RECORD_SIZE
-            order_bytes = order.to_bytes()
-            data[start_offset:start_offset + Order.RECORD_SIZE] = order_bytes
+        footer = cls._FOOTER
+        records[footer + _ZM_MIN_CUSTOMER] = min(customer_ids)
+        records[footer + _ZM_MAX_CUSTOMER] = max(customer_ids)
+        records[footer + _ZM_MIN_DATE] = min(order_dates)
+        records[footer + _ZM_MAX_DATE] = max(order_dates)
+        region_bitmap = 0
+        for region in set(regions):
+            region_bitmap |= 1 << (region % 32)
+        records[footer + _ZM_REGIONS] = region_bitmap
         
-        return bytes(data)
+        page.num_records = num_records
+        return page
     
     @classmethod
     def from_bytes(cls, page_id: int, data: bytes) -> 'DiskPage':
@@ -160,39 +428,58 @@ class DiskPage:
             
         Returns:
             DiskPage: Reconstructed page with all valid orders
+            
+        Raises:
+            ValueError: If data is not a full page or its header is corrupt
         """
-        if len(data) != cls.PAGE_SIZE:
-            raise ValueError(f"Page data must be exactly {cls.PAGE_SIZE} bytes")
+        # Not cls(page_id): its empty record array would be thrown away right away
+        page = cls.__new__(cls)
+        page._columns = {}
+        page.load(page_id, data)
+        return page
+    
+    def load(self, page_id: int, data: bytes):
+        """
+        Turn this page into the page decoded from data, in place (see from_bytes).
         
-        page = cls(page_id)
+        Lets a buffer pool keep one DiskPage per frame and refill it on every
+        miss instead of allocating a new page object. Like reset(), only use
+        it on a page nobody else still reads.
         
-        # Read each potential record slot
-        for i in range(cls.RECORDS_PER_PAGE):
-            start_offset = i * Order.RECORD_SIZE
-            record_data = data[start_offset:start_offset + Order.RECORD_SIZE]
+        Args:
+            page_id: ID of the page
+            data: PAGE_SIZE bytes read from disk
             
-            # Check if this slot contains a valid record (non-zero order_id)
-            if len(record_data) >= 4:
-                order_id = struct.unpack('I', record_data[:4])[0]
-                if order_id != 0:  # Valid record
-                    try:
-                        order = Order.from_bytes(record_data)
-                        page.orders.append(order)
-                    except (ValueError, struct.error):
-                        # Skip corrupted records
-                        continue
+        Raises:
+            ValueError: If data is not a full page or its header is corrupt
+                (the page is left unchanged)
+        """
+        if len(data) != self.PAGE_SIZE:
+            raise ValueError(f"Page data must be exactly {self.PAGE_SIZE} bytes")
         
-        return page
+        # View the page bytes as uint32 slots without copying them
+        records = unpack_page(data)
+        
+        # The header says how many records the page holds
+        num_records = records[0]
+        if num_records > self.RECORDS_PER_PAGE:
+            raise ValueError(f"Corrupt page {page_id}: header claims {num_records} records")
+        
+        self.page_id = page_id
+        self.records = records
+        self.num_records = num_records
+        self._orders = None
+        self._columns.clear()
     
     def __str__(self) -> str:
-        return f"DiskPage(id={self.page_id}, orders={len(self.orders)}/{self.RECORDS_PER_PAGE})"
+        return f"DiskPage(id={self.page_id}, orders={self.num_records}/{self.RECORDS_PER_PAGE})"
 
 
 # Example usage and testing
 if __name__ == "__main__":
     # Test Order serialization
     print("Testing Order serialization...")
-    original_order = Order(1, 100, 50, 2, 29.99, 365, 1)
+    original_order = Order(1, 100, 50, 2, 2999, 365, 1)
     
     # Serialize and deserialize
     serialized = original_order.to_bytes()
@@ -209,7 +496,7 @@ if __name__ == "__main__":
     
     # Add some orders
     for i in range(5):
-        order = Order(i+1, (i % 10) + 1, (i % 100) + 1, 1, 10.0 + i, i, (i % 5) + 1)
+        order = Order(i+1, (i % 10) + 1, (i % 100) + 1, 1, 1000 + i * 100, i, (i % 5) + 1)
         page.add_order(order)
     
     print(f"Page before serialization: {page}")
@@ -220,4 +507,7 @@ if __name__ == "__main__":
     
     print(f"Page after round-trip: {restored_page}")
     print(f"First order: {restored_page.orders[0]}")
-    print(f"Last order: {restored_page.orders[-1]}")
\ No newline at end of file
+    print(f"Last order: {restored_page.orders[-1]}")
+    print(f"Customer column: {list(restored_page.column('customer_id'))}")
+    print(f"May contain customer 3 / 42: {restored_page.may_contain_customer(3)} / "
+          f"{restored_page.may_contain_customer(42)}")
\ No newline at end of file
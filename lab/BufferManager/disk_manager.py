@@ -6,10 +6,17 @@ This module handles all disk operations and measures real I/O performance.
 I.e., our buffer manager base functialities
 """
 
+import logging
+import mmap
 import os
 import time
-from typing import Dict, Any, Optional
-from base_data_struct import DiskPage
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional
+from base_data_struct import DiskPage, pack_page
+
+# Per-page I/O is logged at DEBUG level, so it costs nothing unless enabled, e.g.:
+#   logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+logger = logging.getLogger(__name__)
 
 
 class DiskManager:
@@ -18,16 +25,43 @@ class DiskManager:
     
     This class simulates the storage manager component of a real database system.
     It handles reading and writing pages to/from disk and measures the actual time spent in I/O operations.
+    
+    The database file is opened once and kept open: pages are accessed with
+    positional os.pread/os.pwrite calls on that descriptor, so no seek and no
+    Python file object is needed per page. Call close() when done.
+    
+    With use_mmap (the default) the file is also memory-mapped and read_page
+    returns pages that are views straight into the OS page cache, so reading
+    a page copies nothing. Writes still go through os.pwrite; the shared
+    mapping sees them immediately.
+    
+    With simulate_latency, every read/write also accounts a fixed spinning-disk
+    latency (READ_LATENCY / WRITE_LATENCY) in simulated_read_time and
+    simulated_write_time. By default this is only bookkeeping; pass
+    inject_latency=True to really sleep for it.
     """
+    READ_LATENCY = 0.01    # 10ms per simulated disk read
+    WRITE_LATENCY = 0.015  # 15ms per simulated disk write (writes are slower)
+    IOV_BATCH = 64         # Max pages per os.pwritev call in write_pages
     
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, use_mmap: bool = True,
+                 simulate_latency: bool = False, inject_latency: bool = False):
         """
         Initialize the disk manager for a specific database file.
         
         Args:
             filename: Path to the database file
+            use_mmap: Serve reads from a memory map of the file instead of os.pread
+            simulate_latency: Account a simulated seek latency for every page I/O
+            inject_latency: With simulate_latency, also sleep for that latency
         """
         self.filename = filename
+        self.use_mmap = use_mmap
+        self.simulate_latency = simulate_latency
+        self.inject_latency = inject_latency
+        self._mm: Optional[mmap.mmap] = None
+        self._mm_size = 0
+        self._sequential = False  # Set by advise_sequential
         
         # I/O Statistics - students will analyze these
         self.read_count = 0
@@ -36,12 +70,97 @@ class DiskManager:
         self.total_write_time = 0.0
         self.bytes_read = 0
         self.bytes_written = 0
+        self.simulated_read_time = 0.0
+        self.simulated_write_time = 0.0
+        
+        # Last pages touched, as ('read' | 'write', page_id), for interactive inspection
+        self.recent_pages = deque(maxlen=16)
         
         # Ensure database file exists
         self._ensure_file_exists()
         
+        # Single raw descriptor used for every page read and write
+        self._fd: Optional[int] = os.open(filename, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+        self._file_size = os.fstat(self._fd).st_size  # Kept up to date by write_page
+        self._dirty_since_sync = 0  # Pages written since the last fsync
+        
         print(f"DiskManager initialized for: {filename}")
     
+    def _remap(self):
+        """
+        Map the whole file again, e.g. after it has grown.
+        
+        The old map is not closed explicitly: pages read earlier may still be
+        viewing it, and it is unmapped once the last of them is gone.
+        """
+        size = os.fstat(self._fd).st_size
+        # An empty file cannot be mapped
+        self._mm = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ) if size else None
+        self._mm_size = size
+        if self._sequential:
+            self._advise_map()
+    
+    def _advise_map(self):
+        """Ask for aggressive readahead on the current map (where madvise exists)."""
+        if self._mm is not None and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self._mm.madvise(mmap.MADV_SEQUENTIAL)
+            self._mm.madvise(mmap.MADV_WILLNEED)
+    
+    def advise_sequential(self):
+        """
+        Tell the OS that the file is about to be scanned from start to end.
+        
+        With use_mmap, the map is advised MADV_SEQUENTIAL | MADV_WILLNEED, so the
+        kernel reads ahead aggressively and drops pages behind the scan, and
+        full scans mostly find their pages already in memory. The advice also
+        applies to maps created later when the file grows. The descriptor
+        itself gets posix_fadvise(POSIX_FADV_SEQUENTIAL) and POSIX_FADV_WILLNEED,
+        which doubles the readahead window for the os.pread path too.
+        These are only hints: where they are unsupported nothing happens.
+        
+        On Linux the device readahead limit can also be raised, e.g.
+        echo 4096 > /sys/block/<dev>/queue/read_ahead_kb (needs root).
+        """
+        self._sequential = True
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(self._fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(self._fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        if self.use_mmap:
+            if self._mm is None:
+                self._remap()  # _remap advises the new map
+            else:
+                self._advise_map()
+    
+    def truncate(self, num_pages: int = 0):
+        """
+        Cut the database file down to its first num_pages pages (default: empty it).
+        
+        Bulk loads start with this, so a file that held a bigger database
+        before does not keep stale pages past the end of the new data.
+        
+        Args:
+            num_pages: Number of pages to keep
+        """
+        # Drop the map first: touching a mapped range past the end of the file faults
+        self._mm = None
+        self._mm_size = 0
+        os.ftruncate(self._fd, num_pages * DiskPage.PAGE_SIZE)
+        self._file_size = num_pages * DiskPage.PAGE_SIZE
+    
+    def close(self):
+        """Close the database file. The DiskManager cannot be used afterwards."""
+        self._mm = None
+        self._mm_size = 0
+        if self._fd is not None:
+            self.sync()
+            os.close(self._fd)
+            self._fd = None
+    
+    def __del__(self):
+        # _fd may be missing if __init__ failed before opening the file
+        if getattr(self, '_fd', None) is not None:
+            self.close()
+    
     def _ensure_file_exists(self):
         """Create the database file if it doesn't exist."""
         if not os.path.exists(self.filename):
@@ -49,7 +168,7 @@ class DiskManager:
                 pass  # Create empty file
             print(f"Created new database file: {self.filename}")
     
-    def read_page(self, page_id: int) -> Optional[DiskPage]:
+    def read_page(self, page_id: int, dest: Optional[DiskPage] = None) -> Optional[DiskPage]:
         """
         Read a page from disk.
         
@@ -60,48 +179,78 @@ class DiskManager:
         
         Args:
             page_id: ID of the page to read
+            dest: Existing page to load the data into (DiskPage.load) instead
+                of allocating a new one, e.g. the page object of a buffer frame
             
         Returns:
-            DiskPage if successful, None if page doesn't exist or error occurred
+            DiskPage if successful (dest, if given), None if page doesn't exist or error occurred
         """
         # Start timing the I/O operation
         start_time = time.perf_counter()
         
+        # Simulate disk seek + read time
+        if self.simulate_latency:
+            self.simulated_read_time += self.READ_LATENCY
+            if self.inject_latency:
+                time.sleep(self.READ_LATENCY)
+        
         try:
-            with open(self.filename, 'rb') as f:
-                # Seek to the page location on disk (4kB per page) 
-                f.seek(page_id * DiskPage.PAGE_SIZE)
-                
-                # Read exactly one page
-                data = f.read(DiskPage.PAGE_SIZE)
-                
-                if len(data) == DiskPage.PAGE_SIZE:
-                    # Successfully read a full page
+            # Read exactly one page at its location on disk (4kB per page)
+            offset = page_id * DiskPage.PAGE_SIZE
+            if self.use_mmap:
+                if offset + DiskPage.PAGE_SIZE > self._mm_size:
+                    self._remap()  # The file may have grown since it was mapped
+                data = memoryview(self._mm)[offset:offset + DiskPage.PAGE_SIZE] if self._mm else b''
+            else:
+                data = os.pread(self._fd, DiskPage.PAGE_SIZE, offset)
+            
+            if len(data) == DiskPage.PAGE_SIZE:
+                # Successfully read a full page
+                if dest is None:
                     page = DiskPage.from_bytes(page_id, data)
-                    
-                    # Record performance metrics
-                    read_time = time.perf_counter() - start_time
-                    self.read_count += 1
-                    self.total_read_time += read_time
-                    self.bytes_read += DiskPage.PAGE_SIZE
-                    
-                    if page_id % 1000 == 0:
-                        if page_id != 0:
-                            print("...skipping print...")
-                        print(f"DISK READ: Page {page_id} ({len(page.orders)} records) - {read_time*1000:.3f}ms")
-                    return page
                 else:
-                    print(f"DISK READ: Page {page_id} - incomplete read ({len(data)} bytes)")
-                    return None
+                    dest.load(page_id, data)
+                    page = dest
+                
+                # Record performance metrics
+                read_time = time.perf_counter() - start_time
+                self.read_count += 1
+                self.total_read_time += read_time
+                self.bytes_read += DiskPage.PAGE_SIZE
+                self.recent_pages.append(('read', page_id))
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("DISK READ: Page %d (%d records) - %.3fms",
+                                 page_id, page.num_records, read_time * 1000)
+                return page
+            else:
+                logger.warning("DISK READ: Page %d - incomplete read (%d bytes)", page_id, len(data))
+                return None
                     
         except (FileNotFoundError, IOError, OSError) as e:
-            print(f"DISK READ ERROR: Page {page_id} - {e}")
+            logger.error("DISK READ ERROR: Page %d - %s", page_id, e)
             return None
     
+    def sync(self):
+        """
+        Force every page written so far to actually reach the disk (not just OS cache).
+        
+        write_page only hands the data to the OS. fsync is by far the slowest
+        part of a write, so like a real buffer pool we pay it once per batch
+        (end of a bulk load, checkpoint, close) instead of once per page.
+        The time spent here counts as write time.
+        """
+        if self._dirty_since_sync == 0 or self._fd is None:
+            return
+        start_time = time.perf_counter()
+        os.fsync(self._fd)
+        self.total_write_time += time.perf_counter() - start_time
+        self._dirty_since_sync = 0
+    
     def write_page(self, page: DiskPage) -> bool:
         """
         Write a page to disk.
-        Forces the data to actually reach the disk (not just OS cache) so to measure real I/O performance.
+        The page is handed to the OS; call sync() to force it to the disk itself.
         
         Args:
             page: DiskPage to write to disk
@@ -111,6 +260,12 @@ class DiskManager:
         """
         start_time = time.perf_counter()
         
+        # Simulate disk seek + write time
+        if self.simulate_latency:
+            self.simulated_write_time += self.WRITE_LATENCY
+            if self.inject_latency:
+                time.sleep(self.WRITE_LATENCY)
+        
         try:
             # Ensure file is large enough to hold this page
             # Write a page to disk at the specified position. We must first ensure the file 
@@ -118,34 +273,169 @@ class DiskManager:
             # out of order (e.g., write page 5 before pages 1-4 exist). If the file is too 
             # small, we extend it with zero bytes to prevent seek-beyond-EOF errors.
             required_size = (page.page_id + 1) * DiskPage.PAGE_SIZE
-            current_size = os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
             
-            if current_size < required_size:
-                # Extend file to required size
-                with open(self.filename, 'ab') as f:
-                    # Pad with zeros to ensure the file is large enough  
-                    f.write(b'\0' * (required_size - current_size)) # we do this to avoid seek-beyond-EOF errors, in real system this will be handled differently (e.g., preallocation)
+            if self._file_size < required_size:
+                # Extend file to required size. ftruncate is a single syscall: the new
+                # range reads back as zeros, but no zero bytes are built or written
+                # (on most filesystems it becomes a sparse "hole").
+                os.ftruncate(self._fd, required_size)
+                self._file_size = required_size
             
-            # Write the page
-            with open(self.filename, 'r+b') as f:
-                f.seek(page.page_id * DiskPage.PAGE_SIZE)
-                f.write(page.to_bytes())
-                f.flush()  # Force to OS buffer (flush Python buffer), i.e., it (tries to) bypass Python caching
-                os.fsync(f.fileno())  # Force OS to write to disk
+            # Write the page straight from its record buffer (no serialization copy,
+            # and with a raw descriptor there is no Python buffer to flush)
+            os.pwrite(self._fd, pack_page(page.records), page.page_id * DiskPage.PAGE_SIZE)
+            self._dirty_since_sync += 1
             
             # Record performance metrics
             write_time = time.perf_counter() - start_time
             self.write_count += 1
             self.total_write_time += write_time
             self.bytes_written += DiskPage.PAGE_SIZE
+            self.recent_pages.append(('write', page.page_id))
             
-            print(f"DISK WRITE: Page {page.page_id} - {write_time*1000:.3f}ms")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("DISK WRITE: Page %d - %.3fms", page.page_id, write_time * 1000)
             return True
             
         except (IOError, OSError) as e:
-            print(f"DISK WRITE ERROR: Page {page.page_id} - {e}")
+            logger.error("DISK WRITE ERROR: Page %d - %s", page.page_id, e)
             return False
-    
+
+    def write_pages_bulk(self, data, first_page_id: int = 0) -> bool:
+        """
+        Write a run of consecutive pages to disk in one go.
+
+        data holds the encoded pages back to back (e.g. a bytearray filled with
+        pack_page(page.records, data, i * PAGE_SIZE)). It is written with a
+        single os.pwrite instead of one syscall per page, which is how bulk
+        loads should reach the disk. Being one sequential write, it accounts a
+        single simulated WRITE_LATENCY, not one per page.
+
+        Args:
+            data: Encoded pages, a multiple of DiskPage.PAGE_SIZE bytes long
+            first_page_id: ID of the first page in data
+
+        Returns:
+            bool: True if write successful, False otherwise
+
+        Raises:
+            ValueError: If data is not made of whole pages
+        """
+        view = memoryview(data).cast('B')
+        if len(view) % DiskPage.PAGE_SIZE:
+            raise ValueError(f"Bulk write of {len(view)} bytes is not a whole number of pages")
+        num_pages = len(view) // DiskPage.PAGE_SIZE
+        if num_pages == 0:
+            return True
+
+        start_time = time.perf_counter()
+
+        if self.simulate_latency:
+            self.simulated_write_time += self.WRITE_LATENCY
+            if self.inject_latency:
+                time.sleep(self.WRITE_LATENCY)
+
+        try:
+            offset = first_page_id * DiskPage.PAGE_SIZE
+            required_size = offset + len(view)
+            if self._file_size < required_size:
+                os.ftruncate(self._fd, required_size)
+                self._file_size = required_size
+
+            # pwrite may write less than asked for very large buffers, so loop
+            written = 0
+            while written < len(view):
+                written += os.pwrite(self._fd, view[written:], offset + written)
+            self._dirty_since_sync += num_pages
+
+            # Record performance metrics
+            write_time = time.perf_counter() - start_time
+            self.write_count += num_pages
+            self.total_write_time += write_time
+            self.bytes_written += len(view)
+            last_page_id = first_page_id + num_pages
+            self.recent_pages.extend(('write', page_id) for page_id in
+                                     range(max(first_page_id, last_page_id - self.recent_pages.maxlen), last_page_id))
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("DISK WRITE: Pages %d-%d - %.3fms",
+                             first_page_id, last_page_id - 1, write_time * 1000)
+            return True
+
+        except (IOError, OSError) as e:
+            logger.error("DISK WRITE ERROR: Pages from %d - %s", first_page_id, e)
+            return False
+
+    def write_pages(self, pages: Iterable[DiskPage]) -> bool:
+        """
+        Write many pages with as few syscalls as possible, e.g. to flush a buffer pool.
+
+        Pages with consecutive IDs are written with one os.pwritev straight
+        from their record buffers (up to IOV_BATCH pages per call), so unlike
+        write_pages_bulk nothing is copied into a staging buffer first.
+        Each run of pages accounts one simulated WRITE_LATENCY.
+        On platforms without os.pwritev this falls back to write_page per page.
+
+        Args:
+            pages: Pages to write, in any order
+
+        Returns:
+            bool: True if every page was written, False otherwise
+        """
+        pages = sorted(pages, key=lambda page: page.page_id)
+        if not hasattr(os, 'pwritev'):
+            return all([self.write_page(page) for page in pages])
+
+        ok = True
+        run_start = 0
+        for i in range(1, len(pages) + 1):
+            # Cut a run where page IDs stop being consecutive or the batch is full
+            if (i == len(pages) or pages[i].page_id != pages[i - 1].page_id + 1
+                    or i - run_start == self.IOV_BATCH):
+                ok = self._write_run(pages[run_start:i]) and ok
+                run_start = i
+        return ok
+
+    def _write_run(self, pages: List[DiskPage]) -> bool:
+        """Write pages with consecutive IDs using a single os.pwritev."""
+        start_time = time.perf_counter()
+
+        if self.simulate_latency:
+            self.simulated_write_time += self.WRITE_LATENCY
+            if self.inject_latency:
+                time.sleep(self.WRITE_LATENCY)
+
+        first_page_id = pages[0].page_id
+        try:
+            offset = first_page_id * DiskPage.PAGE_SIZE
+            total = len(pages) * DiskPage.PAGE_SIZE
+            if self._file_size < offset + total:
+                os.ftruncate(self._fd, offset + total)
+                self._file_size = offset + total
+
+            buffers = [pack_page(page.records) for page in pages]
+            written = os.pwritev(self._fd, buffers, offset)
+            while written < total:  # Short write: finish the remaining bytes
+                i, skip = divmod(written, DiskPage.PAGE_SIZE)
+                written += os.pwrite(self._fd, buffers[i][skip:], offset + written)
+            self._dirty_since_sync += len(pages)
+
+            # Record performance metrics
+            write_time = time.perf_counter() - start_time
+            self.write_count += len(pages)
+            self.total_write_time += write_time
+            self.bytes_written += total
+            self.recent_pages.extend(('write', page.page_id) for page in pages)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("DISK WRITE: Pages %d-%d - %.3fms",
+                             first_page_id, pages[-1].page_id, write_time * 1000)
+            return True
+
+        except (IOError, OSError) as e:
+            logger.error("DISK WRITE ERROR: Pages %d-%d - %s", first_page_id, pages[-1].page_id, e)
+            return False
+
     def get_stats(self) -> Dict[str, Any]:
         """
         Get detailed I/O performance statistics.
@@ -180,7 +470,10 @@ class DiskManager:
             'bytes_read': self.bytes_read,
             'bytes_written': self.bytes_written,
             'read_throughput_mbps': read_throughput,
-            'write_throughput_mbps': write_throughput
+            'write_throughput_mbps': write_throughput,
+            'simulated_read_time': self.simulated_read_time,
+            'simulated_write_time': self.simulated_write_time,
+            'simulated_io_time': self.simulated_read_time + self.simulated_write_time
         }
     
     def reset_stats(self):
@@ -191,6 +484,8 @@ class DiskManager:
         self.total_write_time = 0.0
         self.bytes_read = 0
         self.bytes_written = 0
+        self.simulated_read_time = 0.0
+        self.simulated_write_time = 0.0
         print("DiskManager statistics reset")
     
     def print_stats(self):
@@ -208,12 +503,15 @@ class DiskManager:
         print(f"Data written:          {stats['bytes_written']/(1024*1024):.2f} MB")
         print(f"Read throughput:       {stats['read_throughput_mbps']:.1f} MB/s")
         print(f"Write throughput:      {stats['write_throughput_mbps']:.1f} MB/s")
+        if self.simulate_latency:
+            print(f"Simulated I/O time:    {stats['simulated_io_time']:.3f}s")
 
 
 # Example usage and testing
 if __name__ == "__main__":
     from base_data_struct import Order
     
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")  # Show every page I/O
     print("Testing DiskManager...")
     
     # Create a test database
@@ -222,7 +520,7 @@ if __name__ == "__main__":
     # Create a page with some orders
     page = DiskPage(0)
     for i in range(10):
-        order = Order(i+1, (i % 5) + 1, (i % 20) + 1, 1, 10.0 + i, i, (i % 3) + 1)
+        order = Order(i+1, (i % 5) + 1, (i % 20) + 1, 1, 1000 + i * 100, i, (i % 3) + 1)
         page.add_order(order)
     
     print(f"\nCreated test page: {page}")
@@ -244,12 +542,15 @@ if __name__ == "__main__":
         if page.orders and read_page.orders:
             orig = page.orders[0]
             read = read_page.orders[0]
-            print(f"First order matches: {orig.order_id == read.order_id and orig.price == read.price}")
+            print(f"First order matches: {orig.order_id == read.order_id and orig.price_cents == read.price_cents}")
+    
+    print(f"Recently touched pages: {list(disk.recent_pages)}")
     
     # Print performance statistics
     disk.print_stats()
     
     # Clean up
+    disk.close()
     if os.path.exists("test_disk.db"):
         os.remove("test_disk.db")
         print("\nCleaned up test file")
\ No newline at end of file
@@ -0,0 +1,346 @@
+"""
+scan.py - Page-scan kernels for the Buffer Manager Lab
+
+Analytics queries spend most of their time in one tight loop: walk the
+records of a page, test a predicate (customer_id == X, region == Y) and add
+up the price. Building an Order object per record just to read two of its
+fields is pure overhead, so these kernels work directly on the flat
+uint32 record buffer of a DiskPage (page header, then 7 slots per record, see
+base_data_struct).
+
+If numba is installed the kernels are compiled to machine code with @njit.
+Without it, the same functions fall back to strided column slices, which
+still keep the per-record work inside C.
+"""
+
+import heapq
+import time
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, Tuple
+from base_data_struct import DiskPage, Order, ORDER_FIELDS
+from disk_manager import DiskManager
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ModuleNotFoundError:
+    HAVE_NUMBA = False
+
+
+SLOTS_PER_RECORD = Order.RECORD_SIZE // 4  # uint32 slots per record
+HEADER_SLOTS = DiskPage.HEADER_SIZE // 4  # Records start after the page header
+PRICE_SLOT = HEADER_SLOTS + ORDER_FIELDS.index('price_cents')
+
+
+# The record layout is passed in as arguments rather than read from module
+# globals: numba freezes globals into its on-disk cache, which would then go
+# stale if the layout in base_data_struct changed. price_slot and field_slot
+# are slot indexes within the page, i.e. they already include the header.
+
+def _sum_price_where(records, num_records, slots_per_record, price_slot, field_slot, value):
+    total = 0
+    for i in range(num_records):
+        base = i * slots_per_record
+        if records[base + field_slot] == value:
+            total += records[base + price_slot]
+    return total
+
+
+def _count_where(records, num_records, slots_per_record, field_slot, value):
+    count = 0
+    for i in range(num_records):
+        if records[i * slots_per_record + field_slot] == value:
+            count += 1
+    return count
+
+
+def _aggregate_page(records, num_records, slots_per_record, customer_slot, product_slot,
+                    quantity_slot, price_slot, date_slot, region_slot,
+                    customer_spending, product_sales, monthly_revenue, region_revenue, region_orders):
+    # One pass over the page updates all four dashboard aggregates
+    for i in range(num_records):
+        base = i * slots_per_record
+        price = records[base + price_slot]
+        region = records[base + region_slot]
+        customer_spending[records[base + customer_slot]] += price
+        product_sales[records[base + product_slot]] += records[base + quantity_slot]
+        monthly_revenue[records[base + date_slot] // 30] += price
+        region_revenue[region] += price
+        region_orders[region] += 1
+
+
+def _group_sum(records, num_records, slots_per_record, key_slot, key_divisor, value_slot, sums, counts):
+    # GROUP BY key // key_divisor: sum of the value slot and row count per group
+    for i in range(num_records):
+        base = i * slots_per_record
+        key = records[base + key_slot] // key_divisor
+        sums[key] += records[base + value_slot]
+        counts[key] += 1
+
+
+if HAVE_NUMBA:
+    # nogil: the compiled loops release the GIL, so queries running in
+    # threads (step 3's parallel dashboard) can aggregate at the same time
+    _sum_price_where = njit(cache=True, nogil=True)(_sum_price_where)
+    _count_where = njit(cache=True, nogil=True)(_count_where)
+    # Not parallel: prange over records would race on the shared histograms
+    _aggregate_page = njit(cache=True, nogil=True)(_aggregate_page)
+    _group_sum = njit(cache=True, nogil=True)(_group_sum)
+else:
+    # Same kernels on strided column slices, so the loop over records runs in C
+    def _sum_price_where(records, num_records, slots_per_record, price_slot, field_slot, value):
+        end = HEADER_SLOTS + num_records * slots_per_record
+        field = records[field_slot:end:slots_per_record]
+        prices = records[price_slot:end:slots_per_record]
+        return sum(price for f, price in zip(field, prices) if f == value)
+
+    def _count_where(records, num_records, slots_per_record, field_slot, value):
+        return records[field_slot:HEADER_SLOTS + num_records * slots_per_record:slots_per_record].tolist().count(value)
+
+    def _aggregate_page(records, num_records, slots_per_record, customer_slot, product_slot,
+                        quantity_slot, price_slot, date_slot, region_slot,
+                        customer_spending, product_sales, monthly_revenue, region_revenue, region_orders):
+        end = HEADER_SLOTS + num_records * slots_per_record
+        for customer_id, product_id, quantity, price, order_date, region in zip(
+                records[customer_slot:end:slots_per_record], records[product_slot:end:slots_per_record],
+                records[quantity_slot:end:slots_per_record], records[price_slot:end:slots_per_record],
+                records[date_slot:end:slots_per_record], records[region_slot:end:slots_per_record]):
+            customer_spending[customer_id] += price
+            product_sales[product_id] += quantity
+            monthly_revenue[order_date // 30] += price
+            region_revenue[region] += price
+            region_orders[region] += 1
+
+    def _group_sum(records, num_records, slots_per_record, key_slot, key_divisor, value_slot, sums, counts):
+        end = HEADER_SLOTS + num_records * slots_per_record
+        for key, value in zip(records[key_slot:end:slots_per_record], records[value_slot:end:slots_per_record]):
+            key //= key_divisor
+            sums[key] += value
+            counts[key] += 1
+
+
+def page_sum_price_where(page: DiskPage, field: str, value: int) -> int:
+    """
+    Sum the price of every order in a page whose field equals value.
+
+    Args:
+        page: Page to scan
+        field: Field name from ORDER_FIELDS (e.g. 'customer_id', 'region')
+        value: Value the field must be equal to
+
+    Returns:
+        int: Total price in cents
+    """
+    return _sum_price_where(page.records, page.num_records, SLOTS_PER_RECORD, PRICE_SLOT,
+                            HEADER_SLOTS + ORDER_FIELDS.index(field), value)
+
+
+def page_count_where(page: DiskPage, field: str, value: int) -> int:
+    """Count the orders in a page whose field equals value."""
+    return _count_where(page.records, page.num_records, SLOTS_PER_RECORD,
+                        HEADER_SLOTS + ORDER_FIELDS.index(field), value)
+
+
+def iter_pages(disk_manager: DiskManager, num_pages: int) -> Iterator[DiskPage]:
+    """Yield every readable page of the database in order."""
+    for page_id in range(num_pages):
+        page = disk_manager.read_page(page_id)
+        if page:
+            yield page
+
+
+def scan_sum_price_by_customer(pages: Iterable[DiskPage], customer_id: int) -> float:
+    """
+    Total amount spent by one customer.
+
+    Args:
+        pages: Pages to scan (e.g. iter_pages(disk, num_pages))
+        customer_id: Customer to aggregate
+
+    Returns:
+        float: Total spent in dollars
+    """
+    slot = HEADER_SLOTS + ORDER_FIELDS.index('customer_id')
+    # The page zone map rules out most pages without touching their records
+    total_cents = sum(_sum_price_where(page.records, page.num_records, SLOTS_PER_RECORD,
+                                       PRICE_SLOT, slot, customer_id)
+                      for page in pages if page.may_contain_customer(customer_id))
+    return total_cents / 100.0
+
+
+def scan_region_sales(pages: Iterable[DiskPage], region: int) -> dict:
+    """
+    Order count and revenue of one region.
+
+    Args:
+        pages: Pages to scan
+        region: Region to aggregate
+
+    Returns:
+        dict: order_count and total_revenue (dollars) for the region
+    """
+    slot = HEADER_SLOTS + ORDER_FIELDS.index('region')
+    order_count = 0
+    total_cents = 0
+    for page in pages:
+        if not page.may_contain_region(region):
+            continue
+        order_count += _count_where(page.records, page.num_records, SLOTS_PER_RECORD, slot, region)
+        total_cents += _sum_price_where(page.records, page.num_records, SLOTS_PER_RECORD,
+                                        PRICE_SLOT, slot, region)
+    return {'order_count': order_count, 'total_revenue': total_cents / 100.0}
+
+
+def _grow(totals: array, size: int):
+    """Zero-extend an int64 totals array to at least size entries."""
+    if size > len(totals):
+        totals.extend(array('q', bytes(8 * (size - len(totals)))))
+
+
+def aggregate_dashboard(pages: Iterable[DiskPage]) -> Dict[str, array]:
+    """
+    Compute every dashboard aggregate in a single fused pass over the pages.
+    
+    The outputs are dense arrays indexed by ID (customer, product, month,
+    region), so the kernel only does indexed adds. They grow as pages with
+    larger IDs arrive, so each page is read exactly once and the pages can
+    come from a streaming scan (e.g. through a buffer manager).
+    
+    Args:
+        pages: Pages to aggregate
+        
+    Returns:
+        dict: 'customer_spending', 'monthly_revenue' and 'region_revenue'
+        (cents), 'product_sales' (units) and 'region_orders', each an
+        int64 array indexed by ID
+    """
+    totals = {name: array('q') for name in ('customer_spending', 'product_sales', 'monthly_revenue',
+                                           'region_revenue', 'region_orders')}
+    
+    slots = {field: HEADER_SLOTS + ORDER_FIELDS.index(field) for field in ORDER_FIELDS}
+    for page in pages:
+        if not page.num_records:
+            continue
+        _grow(totals['customer_spending'], max(page.column('customer_id')) + 1)
+        _grow(totals['product_sales'], max(page.column('product_id')) + 1)
+        _grow(totals['monthly_revenue'], max(page.column('order_date')) // 30 + 1)
+        _grow(totals['region_revenue'], max(page.column('region')) + 1)
+        _grow(totals['region_orders'], len(totals['region_revenue']))
+        _aggregate_page(page.records, page.num_records, SLOTS_PER_RECORD,
+                        slots['customer_id'], slots['product_id'], slots['quantity'],
+                        slots['price_cents'], slots['order_date'], slots['region'],
+                        totals['customer_spending'], totals['product_sales'], totals['monthly_revenue'],
+                        totals['region_revenue'], totals['region_orders'])
+    return totals
+
+
+def dashboard_results(totals: Dict[str, array], limit: int = 10) -> Dict[str, object]:
+    """
+    Turn aggregate_dashboard totals into the results of the four dashboard queries.
+    
+    Args:
+        totals: Output of aggregate_dashboard
+        limit: Number of top customers / products to return
+        
+    Returns:
+        dict: monthly_revenue, top_customers, top_products and
+        regional_stats, in the same format as the individual queries
+    """
+    top_customers = heapq.nlargest(limit, ((customer_id, cents) for customer_id, cents
+                                           in enumerate(totals['customer_spending']) if cents),
+                                   key=lambda x: x[1])
+    top_products = heapq.nlargest(limit, ((product_id, quantity) for product_id, quantity
+                                          in enumerate(totals['product_sales']) if quantity),
+                                  key=lambda x: x[1])
+    regional_stats = {}
+    for region, order_count in enumerate(totals['region_orders']):
+        if order_count:
+            total_revenue = totals['region_revenue'][region] / 100
+            regional_stats[region] = {
+                'total_revenue': total_revenue,
+                'order_count': order_count,
+                'avg_order_value': total_revenue / order_count
+            }
+    
+    return {
+        'monthly_revenue': {month: cents / 100 for month, cents in enumerate(totals['monthly_revenue']) if cents},
+        'top_customers': [(customer_id, cents / 100) for customer_id, cents in top_customers],
+        'top_products': top_products,
+        'regional_stats': regional_stats
+    }
+
+
+def group_sum(pages: Iterable[DiskPage], key_field: str, value_field: str,
+              key_divisor: int = 1) -> Tuple[array, array]:
+    """
+    Sum one field per group of another, page by page (GROUP BY key, SUM(value), COUNT(*)).
+    
+    The groups are dense integer IDs, so the totals live in int64 arrays
+    indexed by group, like a bincount with weights. They grow as pages with
+    larger keys arrive, so the pages are only read once: this works on a
+    streaming scan through the buffer manager as well as on a list of pages.
+    
+    Args:
+        pages: Pages to aggregate
+        key_field: Field to group by (e.g. 'customer_id')
+        value_field: Field to sum (e.g. 'price_cents')
+        key_divisor: Group by key_field // key_divisor (e.g. 30 for days -> months)
+        
+    Returns:
+        tuple: (sums, counts), int64 arrays indexed by group; groups without
+        orders have a count of 0
+    """
+    key_slot = HEADER_SLOTS + ORDER_FIELDS.index(key_field)
+    value_slot = HEADER_SLOTS + ORDER_FIELDS.index(value_field)
+    sums = array('q')
+    counts = array('q')
+    for page in pages:
+        if not page.num_records:
+            continue
+        num_groups = max(page.column(key_field)) // key_divisor + 1
+        _grow(sums, num_groups)
+        _grow(counts, num_groups)
+        _group_sum(page.records, page.num_records, SLOTS_PER_RECORD, key_slot, key_divisor,
+                   value_slot, sums, counts)
+    return sums, counts
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    database_file = "ecommerce.db"
+
+    if not os.path.exists(database_file):
+        print(f"❌ Database {database_file} not found!")
+        print("Please run step01_data_generation.py first to create the database.")
+    else:
+        num_pages = os.path.getsize(database_file) // DiskPage.PAGE_SIZE
+        disk = DiskManager(database_file)
+        pages = list(iter_pages(disk, num_pages))
+        print(f"Kernels: {'numba' if HAVE_NUMBA else 'pure Python'}")
+
+        customer_id = 1
+        # Warm-up calls so numba compilation is not timed
+        page_sum_price_where(pages[0], 'customer_id', customer_id)
+        page_count_where(pages[0], 'region', 1)
+
+        start_time = time.perf_counter()
+        kernel_total = scan_sum_price_by_customer(pages, customer_id)
+        kernel_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        object_total = sum(order.price_cents for page in pages for order in page.orders
+                           if order.customer_id == customer_id) / 100
+        object_time = time.perf_counter() - start_time
+
+        print(f"Customer {customer_id} spent ${kernel_total:,.2f} (kernel: {kernel_time*1000:.2f}ms)")
+        print(f"Customer {customer_id} spent ${object_total:,.2f} (Order objects: {object_time*1000:.2f}ms)")
+        print(f"Region 1: {scan_region_sales(pages, 1)}")
+        
+        aggregate_dashboard(pages[:1])  # Warm-up
+        start_time = time.perf_counter()
+        totals = aggregate_dashboard(pages)
+        fused_time = time.perf_counter() - start_time
+        print(f"Fused dashboard aggregates over {len(pages)} pages: {fused_time*1000:.2f}ms "
+              f"(customer {customer_id}: ${totals['customer_spending'][customer_id] / 100:,.2f})")
+        disk.close()
@@ -6,15 +6,84 @@ Run this first to create the database they'll work with.
 
 import random
 import os
-from datetime import datetime, timedelta
-from base_data_struct import Order, DiskPage
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterable, Iterator, Optional, Tuple
+from base_data_struct import Order, DiskPage, pack_page
 from disk_manager import DiskManager
 
 
+# Categorical distributions, as cumulative weights computed once here so that
+# random.choices does not have to rebuild them from the raw weights per call.
+_QUANTITY_POPULATION = (1, 2, 3, 4, 5)
+_QUANTITY_CUM_WEIGHTS = (50, 75, 90, 97, 100)  # weights 50, 25, 15, 7, 3
+_REGION_POPULATION = tuple(range(1, 11))
+_REGION_CUM_WEIGHTS = (20, 35, 47, 57, 65, 73, 80, 86, 93, 100)  # weights 20, 15, 12, 10, 8, 8, 7, 6, 7, 7
+
+# Dates an order may be moved to during the holiday seasons
+_HOLIDAY_DAYS = tuple(range(330, 366)) + tuple(range(695, 731))
+
+
+def _draw_order_columns(rng, num_orders: int, k: int) -> Tuple[list, ...]:
+    """
+    Draw the field values of k orders, one column at a time.
+    
+    Args:
+        rng: Source of randomness: the random module or a random.Random
+        num_orders: Size of the whole dataset (sets the customer pools)
+        k: Number of orders to draw
+        
+    Returns:
+        Tuple of lists: customer_ids, product_ids, quantities, prices_cents,
+        order_dates, regions
+    """
+    # Customer distribution - some customers order more frequently
+    num_frequent = num_orders // 50  # e.g., 1-1,000
+    num_occasional = num_orders // 5 - num_frequent  # e.g., 1,001-10,000
+    
+    # Draw each field for the whole batch at once. One batch call per column
+    # runs the sampling loop in C, instead of several random calls per order.
+    rand = rng.random
+    uniform = rng.uniform
+    choice = rng.choice
+    
+    # Customers and products each take a single uniform draw per order: where
+    # it falls picks the category, and its position inside that category's
+    # share picks the ID uniformly within it. This replaces a coin flip plus
+    # two pre-drawn candidates per order, one of them thrown away.
+    #
+    # 30% of orders come from frequent customers
+    customer_ids = [1 + int(u * (num_frequent / 0.3)) if u < 0.3
+                    else 1 + num_frequent + int((u - 0.3) * (num_occasional / 0.7))
+                    for u in [rand() for _ in repeat(None, k)]]
+    
+    # Product distribution (80/20 rule): 80% of orders are for the 200 hot
+    # products, the rest for products 201-2000
+    product_ids = [1 + int(u * 250) if u < 0.8 else 201 + int((u - 0.8) * 9000)
+                   for u in [rand() for _ in repeat(None, k)]]
+    
+    quantities = rng.choices(_QUANTITY_POPULATION, cum_weights=_QUANTITY_CUM_WEIGHTS, k=k)
+    
+    # Price varies by product category (stored as integer cents)
+    # Hot products are more expensive
+    prices_cents = [int(uniform(50.0, 300.0) * 100) if product_id <= 200 else int(uniform(10.0, 100.0) * 100)
+                    for product_id in product_ids]
+    
+    # Seasonal ordering patterns: 2 years of data (days since 2025-01-01).
+    # During the holiday seasons there is a 30% chance to move the order to a
+    # holiday date, so more orders fall in those periods.
+    order_dates = [choice(_HOLIDAY_DAYS) if (330 <= day <= 365 or 695 <= day <= 730) and rand() < 0.3 else day
+                   for day in rng.choices(range(0, 731), k=k)]
+    
+    regions = rng.choices(_REGION_POPULATION, cum_weights=_REGION_CUM_WEIGHTS, k=k)
+    
+    return customer_ids, product_ids, quantities, prices_cents, order_dates, regions
+
+
 # it can go to 500_000
-def generate_realistic_orders(num_orders: int = 500_000) -> list:
+def iter_orders(num_orders: int = 500_000, batch_size: int = 10_000) -> Iterator[Order]:
     """
-    Generate realistic e-commerce orders with patterns.
+    Generate realistic e-commerce orders with patterns, streaming them in batches.
     
     This creates data that has realistic characteristics:
     - Customers make multiple orders (repeat customers)
@@ -22,75 +91,51 @@ def generate_realistic_orders(num_orders: int = 500_000) -> list:
     - Seasonal patterns in order dates
     - Geographic distribution
     
+    Orders are produced batch_size at a time, so feeding this straight into
+    write_orders_to_database never holds more than one batch in memory.
+    
     Args:
         num_orders: Number of orders to generate
+        batch_size: Number of orders drawn per batch
         
-    Returns:
-        list: List of Order objects
+    Yields:
+        Order objects, with order IDs 1..num_orders
     """
     print(f"Generating {num_orders} realistic orders...")
     
-    orders = []
-    base_date = datetime(2025, 1, 1)
-    
-    # Create some hot products
-    hot_products = list(range(1, 201))  # Products 1-200 are popular
-    cold_products = list(range(201, 2001))  # Products 201-2000 are less popular
+    for first_id in range(1, num_orders + 1, batch_size):
+        k = min(batch_size, num_orders + 1 - first_id)
+        yield from map(Order, range(first_id, first_id + k),
+                       *_draw_order_columns(random, num_orders, k))
     
-    # Generate orders
-    for order_id in range(1, num_orders + 1):
-        # Customer distribution - some customers order more frequently
-        # Pre-define customer pools
-        frequent_customers = list(range(1, num_orders // 50 + 1))  # e.g., 1-1,000
-        occasional_customers = list(range(num_orders // 50 + 1, num_orders // 5 + 1))  # e.g., 1,001-10,000
+    print(f"✅ Generated {num_orders} orders with realistic patterns")
 
-        # Then in the loop:
-        if random.random() < 0.3:
-            customer_id = random.choice(frequent_customers)
-        else:
-            customer_id = random.choice(occasional_customers)
-        
-        # Product distribution (80/20 rule)
-        if random.random() < 0.8:  # 80% of orders are for hot products
-            product_id = random.choice(hot_products)
-        else:
-            product_id = random.choice(cold_products)
-        
-        quantity = random.choices([1, 2, 3, 4, 5], weights=[50, 25, 15, 7, 3])[0]
-        
-        # Price varies by product category
-        if product_id <= 200:  # Hot products are more expensive
-            price = random.uniform(50.0, 300.0)
-        else:
-            price = random.uniform(10.0, 100.0)
-        
-        # Seasonal ordering patterns
-        days_offset = random.randint(0, 730)  # 2 years of data
-        if 330 <= days_offset <= 365 or 695 <= days_offset <= 730:  # Holiday seasons
-            # More orders during holiday seasons
-            if random.random() < 0.3:  # 30% chance to adjust date to holiday
-                days_offset = random.choice(list(range(330, 366)) + list(range(695, 731)))
-        
-        region = random.choices(range(1, 11), weights=[20, 15, 12, 10, 8, 8, 7, 6, 7, 7])[0]
-        
-        order = Order(order_id, customer_id, product_id, quantity, price, days_offset, region)
-        orders.append(order)
-        
-        # Progress indicator
-        if order_id % 10000 == 0:
-            print(f"  Generated {order_id} orders...")
+
+def generate_realistic_orders(num_orders: int = 500_000) -> list:
+    """
+    Generate realistic e-commerce orders as a list (see iter_orders).
     
-    print(f"✅ Generated {len(orders)} orders with realistic patterns")
-    return orders
+    Args:
+        num_orders: Number of orders to generate
+        
+    Returns:
+        list: List of Order objects
+    """
+    return list(iter_orders(num_orders))
 
 
-def write_orders_to_database(orders: list, filename: str) -> int:
+def write_orders_to_database(orders: Iterable[Order], filename: str, pages_per_write: int = 256) -> int:
     """
     Write orders to database file, organized in pages.
     
+    Orders are consumed as they come, so an iterator such as iter_orders()
+    is streamed to disk: only one page and one write buffer of
+    pages_per_write pages (1MB by default) are held in memory.
+    
     Args:
-        orders: List of Order objects to write
+        orders: Order objects to write (a list or any iterable)
         filename: Database filename
+        pages_per_write: Number of pages packed per bulk write
         
     Returns:
         int: Number of pages written
@@ -98,40 +143,50 @@ def write_orders_to_database(orders: list, filename: str) -> int:
     print(f"Writing orders to database: {filename}")
     
     disk = DiskManager(filename)
-    current_page = DiskPage(0)
+    disk.truncate()  # The new data replaces whatever the file held
+    
+    # Pages are packed into a reusable buffer, which reaches the disk in one
+    # bulk write every pages_per_write pages instead of one write per page
+    buf = bytearray(pages_per_write * DiskPage.PAGE_SIZE)
+    first_buffered_page = 0
     page_id = 0
     orders_written = 0
     
+    current_page = DiskPage(0)  # One page object, emptied and refilled for every page
     for order in orders:
-        # Try to add order to current page
-        if not current_page.add_order(order):
-            # Page is full, write it to disk
-            success = disk.write_page(current_page)
-            if success:
-                orders_written += len(current_page.orders)
-                
-                # Start new page
-                page_id += 1
-                current_page = DiskPage(page_id)
-                current_page.add_order(order)
-            else:
-                # print(f"ERROR: Failed to write page {page_id}")
-                raise RuntimeError(f"ERROR: Failed to write page {page_id}")
-                
+        if current_page.add_order(order):
+            continue
+        
+        # Page is full: pack it and start the next one
+        pack_page(current_page.records, buf, (page_id - first_buffered_page) * DiskPage.PAGE_SIZE)
+        orders_written += current_page.num_records
+        page_id += 1
         
-        # Progress indicator for writing
-        if len(orders) > 10000 and (order.order_id % 10000 == 0):
+        if page_id - first_buffered_page == pages_per_write:
+            if not disk.write_pages_bulk(buf, first_buffered_page):
+                raise RuntimeError(f"ERROR: Failed to write pages {first_buffered_page}-{page_id - 1}")
+            first_buffered_page = page_id
+            # Progress indicator for writing
             print(f"  Written {orders_written} orders in {page_id} pages...")
+        
+        current_page.reset(page_id)
+        current_page.add_order(order)
+    
+    # Pack the final page and write what is left in the buffer
+    if current_page.num_records:
+        pack_page(current_page.records, buf, (page_id - first_buffered_page) * DiskPage.PAGE_SIZE)
+        orders_written += current_page.num_records
+        page_id += 1
+    if page_id > first_buffered_page:
+        pending = memoryview(buf)[:(page_id - first_buffered_page) * DiskPage.PAGE_SIZE]
+        if not disk.write_pages_bulk(pending, first_buffered_page):
+            raise RuntimeError(f"ERROR: Failed to write pages {first_buffered_page}-{page_id - 1}")
     
-    # Write the final page
-    if current_page.orders:
-        success = disk.write_page(current_page)
-        if success:
-            orders_written += len(current_page.orders)
-            page_id += 1
+    # Force everything to disk once, rather than once per page
+    disk.sync()
     
     # Display summary
-    file_size_mb = os.path.getsize(filename) / (1024 * 1024)
+    file_size_mb = page_id * DiskPage.PAGE_SIZE / (1024 * 1024)  # We wrote every page: no stat needed
     print(f"✅ Database creation complete!")
     print(f"  Orders written: {orders_written}")
     print(f"  Pages created: {page_id}")
@@ -141,6 +196,76 @@ def write_orders_to_database(orders: list, filename: str) -> int:
     return page_id
 
 
+def _generate_page_chunk(task: Tuple[int, int, int, int]) -> bytes:
+    """
+    Worker of generate_database_parallel: generate and pack a run of pages.
+    
+    Args:
+        task: (num_orders, first_page_id, num_pages, seed)
+        
+    Returns:
+        bytes: The encoded pages, back to back
+    """
+    num_orders, first_page_id, num_pages, seed = task
+    records_per_page = DiskPage.RECORDS_PER_PAGE
+    first_id = first_page_id * records_per_page + 1
+    k = min(num_pages * records_per_page, num_orders + 1 - first_id)
+    columns = (range(first_id, first_id + k),) + _draw_order_columns(random.Random(seed), num_orders, k)
+    
+    buf = bytearray(num_pages * DiskPage.PAGE_SIZE)
+    for i in range(num_pages):
+        page_slice = slice(i * records_per_page, (i + 1) * records_per_page)
+        page = DiskPage.from_columns(first_page_id + i, *(column[page_slice] for column in columns))
+        pack_page(page.records, buf, i * DiskPage.PAGE_SIZE)
+    return bytes(buf)
+
+
+def generate_database_parallel(filename: str, num_orders: int = 500_000, workers: Optional[int] = None,
+                               pages_per_task: int = 64, seed: Optional[int] = None) -> int:
+    """
+    Generate the dataset on all CPU cores and write it to the database file.
+    
+    Generation is CPU-bound Python, so threads would just take turns on the
+    GIL. Instead the pages are split into runs of pages_per_task. A pool of
+    processes gives each run its own random.Random(seed + run), generates its
+    orders and packs its pages. The parent process only writes the returned
+    bytes, in order, with write_pages_bulk.
+    
+    The data follows the same distributions as iter_orders(). It is
+    reproducible for a given seed and does not depend on the number of
+    workers. It is not the same sequence as the single-process generator.
+    
+    Args:
+        filename: Database filename
+        num_orders: Number of orders to generate
+        workers: Number of worker processes (default: one per CPU)
+        pages_per_task: Pages generated per task
+        seed: Base seed (default: drawn from the random module)
+        
+    Returns:
+        int: Number of pages written
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    num_pages = -(-num_orders // DiskPage.RECORDS_PER_PAGE)  # ceil
+    tasks = [(num_orders, first_page_id, min(pages_per_task, num_pages - first_page_id), seed + run)
+             for run, first_page_id in enumerate(range(0, num_pages, pages_per_task))]
+    print(f"Generating {num_orders} orders in {len(tasks)} tasks on {workers or os.cpu_count()} processes...")
+    
+    disk = DiskManager(filename)
+    disk.truncate()  # The new data replaces whatever the file held
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map returns the chunks in task order, so they land at the right place
+        for (_, first_page_id, _, _), chunk in zip(tasks, executor.map(_generate_page_chunk, tasks)):
+            if not disk.write_pages_bulk(chunk, first_page_id):
+                raise RuntimeError(f"ERROR: Failed to write pages from {first_page_id}")
+    disk.sync()
+    disk.close()
+    
+    print(f"✅ Database creation complete: {num_orders} orders in {num_pages} pages")
+    return num_pages
+
+
 def analyze_dataset(filename: str, num_pages: int):
     """
     Analyze the created dataset to show students what they're working with.
@@ -166,9 +291,9 @@ def analyze_dataset(filename: str, num_pages: int):
     sample_pages = [0, num_pages//4, num_pages//2, num_pages-1]
     for page_id in sample_pages:
         page = disk.read_page(page_id)
-        if page and page.orders:
+        if page and page.num_records:
             first_order = page.orders[0]
-            print(f"  Page {page_id}: {len(page.orders)} orders, first order: {first_order}")
+            print(f"  Page {page_id}: {page.num_records} orders, first order: {first_order}")
     
     print(f"\n💡 This dataset will be used to demonstrate the buffer manager!")
     print(f"   - Multiple queries will scan ALL {num_pages} pages")
@@ -199,11 +324,11 @@ def main():
             print(f"Removed existing {database_file}")
     
     # Generate and write data
-    print(f"\nStep 1: Generating {num_orders} orders...")
-    orders = generate_realistic_orders(num_orders)
-    
-    print(f"\nStep 2: Writing orders to database...")
-    num_pages = write_orders_to_database(orders, database_file)
+    # Pages are built column by column in worker processes and written as raw
+    # bytes: no Order object is created on the way to disk.
+    # (write_orders_to_database(iter_orders(num_orders), ...) is the row-by-row version)
+    print(f"\nStep 1+2: Generating {num_orders} orders and writing them to the database...")
+    num_pages = generate_database_parallel(database_file, num_orders)
     
     print(f"\nStep 3: Analyzing dataset...")
     analyze_dataset(database_file, num_pages)
@@ -10,11 +10,14 @@ LEARNING OBJECTIVES:
 - Motivate the need for caching/buffer management
 """
 
+import heapq
 import time
 import os
-from typing import List, Dict, Tuple
-from base_data_struct import DiskPage
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+from base_data_struct import DiskPage, Order
 from disk_manager import DiskManager
+from scan import aggregate_dashboard, dashboard_results
 
 
 class NaiveQueryEngine:
@@ -36,32 +39,66 @@ class NaiveQueryEngine:
         """
         self.disk = disk_manager
         self.num_pages = num_pages
+        # Every query is a full scan in page order: let the OS read ahead
+        self.disk.advise_sequential()
         print(f"Naive Query Engine initialized: {num_pages} pages to scan")
     
-    def full_table_scan(self) -> List:
+    def full_table_scan(self) -> Iterator[Order]:
         """
-        Scan all pages in the database and return all orders.
+        Scan all pages in the database and yield all orders.
         
         This is the fundamental operation that will be repeated by each query,
         demonstrating why caching is necessary.
         
-        Returns:
-            List of all orders in the database
+        Orders are streamed page by page, so a caller that aggregates them
+        never holds the whole table in memory.
+        
+        Yields:
+            Every order in the database, in page order
         """
         print(f"🔍 Scanning all {self.num_pages} pages...")
-        all_orders = []
+        num_orders = 0
         
         start_time = time.perf_counter()
         
         for page_id in range(self.num_pages):
             page = self.disk.read_page(page_id)
             if page:
-                all_orders.extend(page.orders)
+                num_orders += page.num_records
+                yield from page.orders
         
         scan_time = time.perf_counter() - start_time
-        print(f"   Scan completed: {len(all_orders)} orders in {scan_time:.3f}s")
+        print(f"   Scan completed: {num_orders} orders in {scan_time:.3f}s")
+    
+    def scan_columns(self, *fields: str) -> Tuple[List[int], ...]:
+        """
+        Scan all pages and return only the requested order fields, column by column.
+        
+        Reads the same pages as full_table_scan, but copies each field straight
+        out of the page buffer (DiskPage.column) instead of building an Order
+        object per record, so a query only pays for the columns it uses.
         
-        return all_orders
+        Args:
+            fields: Field names from ORDER_FIELDS (e.g. 'customer_id', 'price_cents')
+            
+        Returns:
+            One list per field, aligned by order
+        """
+        print(f"🔍 Scanning all {self.num_pages} pages ({', '.join(fields)})...")
+        columns = tuple([] for _ in fields)
+        
+        start_time = time.perf_counter()
+        
+        for page_id in range(self.num_pages):
+            page = self.disk.read_page(page_id)
+            if page:
+                for column, field in zip(columns, fields):
+                    column.extend(page.column(field))
+        
+        scan_time = time.perf_counter() - start_time
+        print(f"   Scan completed: {len(columns[0]) if columns else 0} orders in {scan_time:.3f}s")
+        
+        return columns
     
     def monthly_revenue_analysis(self) -> Dict[int, float]:
         """
@@ -73,12 +110,15 @@ class NaiveQueryEngine:
         start_time = time.perf_counter()
         
         # This will read ALL pages from disk again!
-        orders = self.full_table_scan()
+        order_dates, prices = self.scan_columns('order_date', 'price_cents')
+        
+        monthly_revenue = defaultdict(int)  # Missing months start at 0: no get() call per order
+        for order_date, price_cents in zip(order_dates, prices):
+            month = order_date // 30  # Rough month grouping
+            monthly_revenue[month] += price_cents
         
-        monthly_revenue = {}
-        for order in orders:
-            month = order.order_date // 30  # Rough month grouping
-            monthly_revenue[month] = monthly_revenue.get(month, 0) + order.price
+        # Sum exact integer cents, convert to dollars once per group
+        monthly_revenue = {month: cents / 100 for month, cents in monthly_revenue.items()}
         
         query_time = time.perf_counter() - start_time
         print(f"✓ Monthly revenue analysis completed in {query_time:.3f}s")
@@ -96,14 +136,18 @@ class NaiveQueryEngine:
         start_time = time.perf_counter()
         
         # This will read ALL pages from disk AGAIN!
-        orders = self.full_table_scan()
+        customer_ids, prices = self.scan_columns('customer_id', 'price_cents')
         
-        customer_spending = {}
-        for order in orders:
-            customer_spending[order.customer_id] = customer_spending.get(order.customer_id, 0) + order.price
+        # Customer IDs are small dense integers: index a list instead of hashing into a dict
+        customer_spending = [0] * (max(customer_ids, default=0) + 1)
+        for customer_id, price_cents in zip(customer_ids, prices):
+            customer_spending[customer_id] += price_cents
         
         # Sort by spending and get top customers
-        top_customers = sorted(customer_spending.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top_customers = heapq.nlargest(limit, ((customer_id, cents) for customer_id, cents
+                                               in enumerate(customer_spending) if cents),
+                                       key=lambda x: x[1])
+        top_customers = [(customer_id, cents / 100) for customer_id, cents in top_customers]
         
         query_time = time.perf_counter() - start_time
         print(f"✓ Top customers analysis completed in {query_time:.3f}s")
@@ -121,14 +165,16 @@ class NaiveQueryEngine:
         start_time = time.perf_counter()
         
         # This will read ALL pages from disk YET AGAIN!
-        orders = self.full_table_scan()
+        product_ids, quantities = self.scan_columns('product_id', 'quantity')
         
-        product_sales = {}
-        for order in orders:
-            product_sales[order.product_id] = product_sales.get(order.product_id, 0) + order.quantity
+        product_sales = [0] * (max(product_ids, default=0) + 1)
+        for product_id, quantity in zip(product_ids, quantities):
+            product_sales[product_id] += quantity
         
         # Sort by quantity sold
-        top_products = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top_products = heapq.nlargest(limit, ((product_id, quantity) for product_id, quantity
+                                              in enumerate(product_sales) if quantity),
+                                      key=lambda x: x[1])
         
         query_time = time.perf_counter() - start_time
         print(f"✓ Product popularity analysis completed in {query_time:.3f}s")
@@ -143,37 +189,71 @@ class NaiveQueryEngine:
         start_time = time.perf_counter()
         
         # This will read ALL pages from disk ONE MORE TIME!
-        orders = self.full_table_scan()
+        regions, prices = self.scan_columns('region', 'price_cents')
         
-        regional_stats = {}
-        for order in orders:
-            if order.region not in regional_stats:
-                regional_stats[order.region] = {
-                    'total_revenue': 0,
-                    'order_count': 0,
-                    'avg_order_value': 0
-                }
-            
-            regional_stats[order.region]['total_revenue'] += order.price
-            regional_stats[order.region]['order_count'] += 1
+        region_revenue = [0] * (max(regions, default=0) + 1)
+        region_orders = [0] * len(region_revenue)
+        for region, price_cents in zip(regions, prices):
+            region_revenue[region] += price_cents
+            region_orders[region] += 1
         
         # Calculate averages
-        for region in regional_stats:
-            stats = regional_stats[region]
-            stats['avg_order_value'] = stats['total_revenue'] / stats['order_count']
+        regional_stats = {}
+        for region, order_count in enumerate(region_orders):
+            if order_count:
+                total_revenue = region_revenue[region] / 100  # Cents to dollars
+                regional_stats[region] = {
+                    'total_revenue': total_revenue,
+                    'order_count': order_count,
+                    'avg_order_value': total_revenue / order_count
+                }
         
         query_time = time.perf_counter() - start_time
         print(f"✓ Regional sales analysis completed in {query_time:.3f}s")
         
         return regional_stats
+    
+    def run_all_analytics(self, limit: int = 10) -> Dict[str, object]:
+        """
+        Compute all four dashboard aggregates in a single pass over the table.
+        
+        Query fusion: instead of four queries each scanning every page, one
+        scan reads each page once and updates all four aggregates per order.
+        This cuts disk reads by 4x without any caching - but it only works
+        when all the queries are known up front, which is why real systems
+        still need a buffer manager.
+        
+        Args:
+            limit: Number of top customers / products to return
+            
+        Returns:
+            dict: monthly_revenue, top_customers, top_products and
+            regional_stats, in the same format as the individual queries
+        """
+        print("\n📊 Fused Query: all dashboard aggregates in one scan")
+        start_time = time.perf_counter()
+        
+        # Read every page once, aggregating each in one fused kernel pass
+        pages = (page for page in map(self.disk.read_page, range(self.num_pages)) if page)
+        results = dashboard_results(aggregate_dashboard(pages), limit)
+        
+        query_time = time.perf_counter() - start_time
+        print(f"✓ Fused analysis completed in {query_time:.3f}s")
+        
+        return results
 
 
-def run_analytics_dashboard(query_engine: NaiveQueryEngine):
+def run_analytics_dashboard(query_engine: NaiveQueryEngine, fused: bool = False):
     """
     Run a complete analytics dashboard - this will demonstrate the problem!
     
     Each query will independently scan the entire database, leading to
     massive amounts of redundant I/O.
+    
+    Args:
+        query_engine: Engine to run the queries on
+        fused: Compute all queries in a single scan (run_all_analytics)
+            instead of one scan per query
     """
     print(f"\n{'='*70}")
     print("🚨 RUNNING E-COMMERCE ANALYTICS DASHBOARD (NAIVE VERSION)")
@@ -186,10 +266,17 @@ def run_analytics_dashboard(query_engine: NaiveQueryEngine):
     dashboard_start = time.perf_counter()
     
     # Run the analytics queries
-    monthly_revenue = query_engine.monthly_revenue_analysis()
-    top_customers = query_engine.top_customers_analysis()
-    top_products = query_engine.product_popularity_analysis()
-    regional_stats = query_engine.regional_sales_analysis()
+    if fused:
+        results = query_engine.run_all_analytics()
+        monthly_revenue = results['monthly_revenue']
+        top_customers = results['top_customers']
+        top_products = results['top_products']
+        regional_stats = results['regional_stats']
+    else:
+        monthly_revenue = query_engine.monthly_revenue_analysis()
+        top_customers = query_engine.top_customers_analysis()
+        top_products = query_engine.product_popularity_analysis()
+        regional_stats = query_engine.regional_sales_analysis()
     
     dashboard_time = time.perf_counter() - dashboard_start
     
@@ -232,8 +319,19 @@ def run_analytics_dashboard(query_engine: NaiveQueryEngine):
     print(f"💿 Data Read: {disk_stats['bytes_read']/(1024*1024):.1f} MB")
     print(f"🔄 Average Read Time: {disk_stats['avg_read_time_ms']:.3f} ms per page")
     
-    print(f"\n🚨 THE PROBLEM:")
     pages_per_query = query_engine.num_pages
+    if fused:
+        print(f"\n✅ QUERY FUSION:")
+        print(f"   • One scan of {pages_per_query:,} pages served all 4 queries")
+        print(f"   • 4x fewer page reads than running the queries one by one")
+        print(f"   • But only because every query was known in advance!")
+        return {
+            'dashboard_time': dashboard_time,
+            'disk_stats': disk_stats,
+            'results': results
+        }
+    
+    print(f"\n🚨 THE PROBLEM:")
     total_expected_reads = 4 * pages_per_query  # 4 queries × pages each
     print(f"   • Each query scans all {pages_per_query:,} pages")
     print(f"   • 4 queries = {total_expected_reads:,} total page reads")
@@ -3,23 +3,35 @@ EXERCISE PART 3:
 # WITH BUFFER MANAGER
 Implement a buffer manager to solve the performance problem demonstrated in step 2.
 
-WHAT STUDENTS IMPLEMENT:
-1. Complete the _evict_lru() method (marked with TODO)
+WHAT STUDENTS DO:
+1. Study the _evict_lru() method: O(1) LRU with an OrderedDict of resident pages
 2. Understand how the buffer manager works by reading the code
-3. Test their implementation and see the performance improvement
+3. Test the policies and see the performance improvement
 
 LEARNING OBJECTIVES:
 - Understand buffer pool management concepts
-- Implement LRU replacement policy
+- Understand the LRU replacement policy and its O(1) data structure
 - See dramatic performance improvement
 - Understand cache hit rates and their impact
 """
 
+import heapq
+import logging
 import time
 import os
-from typing import Optional, Dict, Any, List, Tuple
-from base_data_struct import DiskPage
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+from base_data_struct import DiskPage, Order
 from disk_manager import DiskManager
+from scan import aggregate_dashboard, dashboard_results, group_sum
+
+# Every page access is logged at DEBUG level, like the disk manager's I/O log.
+# A full scan makes one call per page, so printing these would cost more than
+# the buffer manager saves. To watch hits, misses and evictions:
+#   logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+logger = logging.getLogger(__name__)
 
 
 class BufferFrame:
@@ -27,15 +39,18 @@ class BufferFrame:
     Represents a single frame in the buffer pool.
     Each frame can hold one page and tracks metadata needed for replacement policies.
     """
+    # Frames are touched on every page access: slots keep them small and fast
+    __slots__ = ('frame_id', 'page', 'page_id', 'is_dirty', 'last_accessed',
+                 'access_frequency')
     
     def __init__(self, frame_id: int):
         self.frame_id = frame_id
         self.page: Optional[DiskPage] = None  # The actual page data
         self.page_id: Optional[int] = None    # Which page is stored here
         self.is_dirty = False                 # Has page been modified?
-        self.last_accessed = 0                # When was this page last accessed (for LRU)
+        self.last_accessed = 0                # When was this page last accessed (LFU ties, step 05's user-aware LRU)
         self.access_frequency = 0             # How often accessed (for LFU)
-        self.clock_bit = False                # For CLOCK replacement policy
+        # The CLOCK usage count lives in BufferManager.usage_counts, indexed by frame_id
     
     def is_free(self) -> bool:
         """Check if this frame is available for use."""
@@ -58,42 +73,152 @@ class BufferManager:
     loads it from disk (MISS), possibly evicting another page.
     """
     
-    def __init__(self, disk_manager: DiskManager, pool_size: int, policy: str = "FIFO"):
+    # Policies with their own eviction; any other one falls back to FIFO (see _evict_page)
+    _NON_FIFO_POLICIES = ("LRU", "TINYLFU", "LFU", "CLOCK", "MIDPOINT")
+    
+    # Largest ring of frames a sequential scan may recycle (see get_page_for_scan)
+    SCAN_RING_SIZE = 32
+    
+    # CLOCK usage counts saturate here (PostgreSQL's BM_MAX_USAGE_COUNT)
+    MAX_USAGE_COUNT = 5
+    # _DECREMENT[d] is a bytes.translate() table that lowers every count by d, stopping at 0
+    _DECREMENT = [bytes(max(0, count - d) for count in range(256)) for d in range(MAX_USAGE_COUNT + 1)]
+    
+    # TinyLFU frequency sketch (see _admit): 4 rows of 4-bit saturating counters,
+    # one multiply-shift hash per row, halved every SKETCH_SAMPLE_FACTOR * pool_size accesses
+    _SKETCH_SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+    SKETCH_MAX_COUNT = 15
+    SKETCH_SAMPLE_FACTOR = 10
+    _HALVE = bytes(count // 2 for count in range(256))
+    
+    # MIDPOINT: share of the pool kept for the old sublist (InnoDB's innodb_old_blocks_pct)
+    MIDPOINT_OLD_PCT = 37
+    
+    def __init__(self, disk_manager: DiskManager, pool_size: int, policy: str = "FIFO",
+                 thread_safe: bool = False):
         """
         Initialize the buffer manager.
         
         Args:
             disk_manager: DiskManager for I/O operations
             pool_size: Number of pages that can be held in memory
-            policy: Replacement policy ("LRU", "FIFO", "CLOCK")
+            policy: Replacement policy ("LRU", "LFU", "FIFO", "CLOCK"),
+                "TINYLFU": LRU behind a TinyLFU admission filter, or
+                "MIDPOINT": LRU with InnoDB-style midpoint insertion
+            thread_safe: Allow get_page / get_page_for_scan from several
+                threads at once (see _make_thread_safe)
         """
         self.disk = disk_manager
         self.pool_size = pool_size
         self.policy = policy
+        self._lock: Optional[threading.RLock] = threading.RLock() if thread_safe else None
         
         # Create the buffer pool - array of frames
         self.frames = [BufferFrame(i) for i in range(pool_size)]
         
-        # Page table: maps page_id -> frame_id for fast lookup
+        # One DiskPage object per frame, created by the frame's first load and
+        # refilled in place on every later miss (no page allocation per miss).
+        # A page returned by get_page is only valid until its frame is evicted.
+        self._page_buffers: List[Optional[DiskPage]] = [None] * pool_size
+        
+        # Page table: maps page_id -> frame_id for fast lookup.
+        # Not pre-sized: CPython has no API for it, and filling the dict with
+        # placeholder keys and deleting them does not keep the capacity (the
+        # next resize compacts the table). Growing to pool_size costs a few
+        # amortized resizes during warm-up only (about 1ms for 10,000 frames).
         self.page_table: Dict[int, int] = {}
         
-        # Free frame management
+        # Free frame management: a list used as a stack, so taking a free
+        # frame is an O(1) pop() from the end with no deque needed
         self.free_frames = list(range(pool_size))  # Initially all frames are free
         
         # Replacement policy state
-        self.access_counter = 0  # Global counter for LRU
+        # Resident pages in recency order, page_id -> frame_id (least recently used first)
+        self._lru: OrderedDict[int, int] = OrderedDict()
+        # For MIDPOINT: pages not hit since they were loaded, least recently
+        # loaded first (the old sublist; _lru is then the young sublist)
+        self._old: OrderedDict[int, int] = OrderedDict()
+        self._young_limit = pool_size - pool_size * self.MIDPOINT_OLD_PCT // 100
+        # For FIFO (and any unknown policy, which _evict_page treats as FIFO):
+        # (load number, frame_id) of every load, oldest first. A frame keeps the
+        # number of the load it holds (0 once cleared), so that an entry is
+        # stale as soon as its frame is cleared or loaded again.
+        self._is_fifo = policy not in self._NON_FIFO_POLICIES
+        self._fifo_queue: deque = deque()
+        self._fifo_loads = 0
+        self._frame_loads: List[int] = [0] * pool_size
         self.clock_hand = 0      # For clock algorithm 
+        # CLOCK usage counts, one byte per frame: stored side by side instead of
+        # on the frame objects, the sweep can work on them with bytearray methods (in C)
+        self.usage_counts = bytearray(pool_size)
+        # For LFU: min-heap of (access_frequency, tick, page_id), see _evict_lfu
+        self._lfu_heap: List[Tuple[int, int, int]] = []
+        self._lfu_tick = 0
+        
+        # Frames that sequential scans recycle: (frame_id, page_id) in load order.
+        # Up to 1/8 of the pool, like PostgreSQL's bulk-read ring.
+        self.scan_ring_size = min(self.SCAN_RING_SIZE, max(1, pool_size // 8))
+        self._scan_ring: deque = deque()
+        
+        # For TINYLFU: count-min sketch of recent access frequencies, one
+        # bytearray of 4 rows; each row is a power of two >= pool_size wide
+        self._sketch_bits = max(4, (pool_size - 1).bit_length())
+        self._sketch_width = 1 << self._sketch_bits
+        self._sketch = bytearray(len(self._SKETCH_SEEDS) * self._sketch_width)
+        self._sketch_additions = 0
+        self.rejections = 0  # Misses not admitted into the pool
         
         # Statistics for analysis
         self.hits = 0       # Cache hits
         self.misses = 0     # Cache misses
         self.evictions = 0  # Number of pages evicted
         
+        # A hit only needs to update what the configured policy reads, so bind
+        # get_page to a hit path specialized for it; any other policy keeps the
+        # generic get_page, which maintains everything
+        specialized_get_page = {
+            "LRU": self._get_page_lru,
+            "LFU": self._get_page_lfu,
+            "TINYLFU": self._get_page_tinylfu,
+            "CLOCK": self._get_page_clock,
+            "FIFO": self._get_page_fifo,
+            "MIDPOINT": self._get_page_midpoint,
+        }.get(policy)
+        if specialized_get_page is not None:
+            self.get_page = specialized_get_page
+        if thread_safe:
+            self._make_thread_safe()
+        
         print(f"🎯 Buffer Manager initialized:")
         print(f"   Pool size: {pool_size} frames")
         print(f"   Policy: {policy}")
         print(f"   Total memory: {pool_size * DiskPage.PAGE_SIZE / (1024*1024):.1f} MB")
     
+    def _make_thread_safe(self):
+        """
+        Serialize get_page and get_page_for_scan with self._lock.
+        
+        Even a hit changes shared state (the LRU order, usage counts, the
+        statistics), so every page request holds the lock, a reentrant one
+        since get_page_for_scan calls get_page. Frames also stop recycling
+        their page objects: a page another thread is still aggregating must
+        not be overwritten when its frame is evicted.
+        """
+        lock = self._lock
+        unlocked_get_page = self.get_page
+        unlocked_get_page_for_scan = self.get_page_for_scan
+        
+        def get_page(page_id: int) -> Optional[DiskPage]:
+            with lock:
+                return unlocked_get_page(page_id)
+        
+        def get_page_for_scan(page_id: int) -> Optional[DiskPage]:
+            with lock:
+                return unlocked_get_page_for_scan(page_id)
+        
+        self.get_page = get_page
+        self.get_page_for_scan = get_page_for_scan
+    
     def get_page(self, page_id: int) -> Optional[DiskPage]:
         """
         Main interface: Get a page from the buffer pool.
@@ -106,45 +231,166 @@ class BufferManager:
         Returns:
             DiskPage if successful, None if error
         """
-        self.access_counter += 1
-        
         # Check if page is already in buffer pool (CACHE HIT)
         if page_id in self.page_table:
             frame_id = self.page_table[page_id]
             frame = self.frames[frame_id]
             
             # Update metadata for replacement policy
-            frame.last_accessed = self.access_counter
+            self._lru.move_to_end(page_id)  # Now the most recently used
             frame.access_frequency += 1
-            frame.clock_bit = True
+            if self.usage_counts[frame_id] < self.MAX_USAGE_COUNT:
+                self.usage_counts[frame_id] += 1
+            if self.policy == "LFU":
+                self._push_lfu(frame)
             
             self.hits += 1
-            print(f"🎯 BUFFER HIT: Page {page_id} found in frame {frame_id}")
+            logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
             return frame.page
         
         # CACHE MISS - need to load from disk
+        return self._get_page_miss(page_id)
+    
+    # get_page specialized per policy (see __init__): same result, but a hit
+    # only touches the replacement state that policy uses
+    
+    def _get_page_lru(self, page_id: int) -> Optional[DiskPage]:
+        frame_id = self.page_table.get(page_id)
+        if frame_id is None:
+            return self._get_page_miss(page_id)
+        self._lru.move_to_end(page_id)
+        self.hits += 1
+        logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
+        return self.frames[frame_id].page
+    
+    def _get_page_lfu(self, page_id: int) -> Optional[DiskPage]:
+        frame_id = self.page_table.get(page_id)
+        if frame_id is None:
+            return self._get_page_miss(page_id)
+        frame = self.frames[frame_id]
+        frame.access_frequency += 1
+        self._push_lfu(frame)
+        self.hits += 1
+        logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
+        return frame.page
+    
+    def _get_page_clock(self, page_id: int) -> Optional[DiskPage]:
+        frame_id = self.page_table.get(page_id)
+        if frame_id is None:
+            return self._get_page_miss(page_id)
+        if self.usage_counts[frame_id] < self.MAX_USAGE_COUNT:
+            self.usage_counts[frame_id] += 1
+        self.hits += 1
+        logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
+        return self.frames[frame_id].page
+    
+    def _get_page_fifo(self, page_id: int) -> Optional[DiskPage]:
+        # FIFO evicts in load order: a hit changes nothing
+        frame_id = self.page_table.get(page_id)
+        if frame_id is None:
+            return self._get_page_miss(page_id)
+        self.hits += 1
+        logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
+        return self.frames[frame_id].page
+    
+    def _get_page_tinylfu(self, page_id: int) -> Optional[DiskPage]:
+        self._sketch_add(page_id)  # Misses count too: that is how a page earns admission
+        frame_id = self.page_table.get(page_id)
+        if frame_id is None:
+            if not self.free_frames and self._lru and not self._admit(page_id, next(iter(self._lru))):
+                # Serve the page straight from disk and keep the pool as it is
+                self.misses += 1
+                self.rejections += 1
+                logger.debug("🚪 TINYLFU: Page %d not admitted, read without caching", page_id)
+                return self.disk.read_page(page_id)
+            return self._get_page_miss(page_id)
+        self._lru.move_to_end(page_id)
+        self.hits += 1
+        logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
+        return self.frames[frame_id].page
+    
+    def _get_page_midpoint(self, page_id: int) -> Optional[DiskPage]:
+        frame_id = self.page_table.get(page_id)
+        if frame_id is None:
+            return self._get_page_miss(page_id)
+        if self._old.pop(page_id, None) is None:
+            self._lru.move_to_end(page_id)
+        else:
+            # Second access: promote the page to the young sublist, and if
+            # that grows too big, age its least recently used page into old
+            self._lru[page_id] = frame_id
+            if len(self._lru) > self._young_limit:
+                aged_page_id, aged_frame_id = self._lru.popitem(last=False)
+                self._old[aged_page_id] = aged_frame_id
+        self.hits += 1
+        logger.debug("🎯 BUFFER HIT: Page %d found in frame %d", page_id, frame_id)
+        return self.frames[frame_id].page
+    
+    def _get_page_miss(self, page_id: int) -> Optional[DiskPage]:
         self.misses += 1
-        print(f"❌ BUFFER MISS: Page {page_id} not in buffer")
+        logger.debug("❌ BUFFER MISS: Page %d not in buffer", page_id)
         return self._load_page_from_disk(page_id)
     
     
-    def _load_page_from_disk(self, page_id: int) -> Optional[DiskPage]:
+    def get_page_for_scan(self, page_id: int) -> Optional[DiskPage]:
+        """
+        Get a page on behalf of a sequential scan.
+        
+        A scan over a table larger than the pool touches every page once:
+        through get_page, it would evict the whole working set of the pool
+        for pages that are never asked for again (sequential flooding).
+        Like PostgreSQL's ring buffers, a scan miss instead reuses a small
+        ring of frames (scan_ring_size): once the ring is full, the page
+        read the longest time ago by the scan makes room for the next one,
+        and the rest of the pool is left alone. While the pool still has
+        free frames, nothing is recycled, so a table that fits in the pool
+        stays there. Resident pages are normal hits.
+        
+        Args:
+            page_id: ID of the page to retrieve
+            
+        Returns:
+            DiskPage if successful, None if error
+        """
+        if page_id in self.page_table:
+            return self.get_page(page_id)
+        
+        self.misses += 1
+        logger.debug("❌ BUFFER MISS: Page %d not in buffer (scan)", page_id)
+        
+        frame_id = None
+        if not self.free_frames and len(self._scan_ring) >= self.scan_ring_size:
+            ring_frame_id, ring_page_id = self._scan_ring.popleft()
+            # Recycle the frame only if it still holds the page this scan put there
+            if self.frames[ring_frame_id].page_id == ring_page_id:
+                self._write_back_and_clear_frame(ring_frame_id)
+                frame_id = ring_frame_id
+        
+        page = self._load_page_from_disk(page_id, frame_id)
+        if page is not None:
+            self._scan_ring.append((self.page_table[page_id], page_id))
+        return page
+    
+    def _load_page_from_disk(self, page_id: int, frame_id: Optional[int] = None) -> Optional[DiskPage]:
         """
         Load a page from disk into the buffer pool.
         
-        This method handles finding a frame for the new page.
+        This method handles finding a frame for the new page, unless the
+        caller already freed one (frame_id).
         """
-        # Try to get a free frame first
-        frame_id = self._get_free_frame()
+        if frame_id is None:
+            # Try to get a free frame first
+            frame_id = self._get_free_frame()
         if frame_id is None:
             # No free frames -- need to evict a page
             frame_id = self._evict_page()
             if frame_id is None:
-                print(f"❌ ERROR: No frames available for page {page_id}")
+                logger.error("❌ ERROR: No frames available for page %d", page_id)
                 return None
         
-        # Load the page from disk
-        page = self.disk.read_page(page_id)
+        # Load the page from disk, into the frame's page object if it has one
+        dest = self._page_buffers[frame_id] if self._lock is None else None
+        page = self.disk.read_page(page_id, dest)
         if page is None:
             # Failed to read - return frame to free list
             if frame_id not in self.free_frames:
@@ -152,106 +398,252 @@ class BufferManager:
             return None
         
         # Install page in the frame
+        self._page_buffers[frame_id] = page
         frame = self.frames[frame_id]
         frame.page = page
         frame.page_id = page_id
         frame.is_dirty = False
-        frame.last_accessed = self.access_counter
         frame.access_frequency = 1
         
         # Update page table
         self.page_table[page_id] = frame_id
+        if self.policy == "MIDPOINT":
+            self._old[page_id] = frame_id  # Newly loaded: head of the old sublist
+        else:
+            self._lru[page_id] = frame_id  # Newly loaded: most recently used
+        self.usage_counts[frame_id] = 1
+        if self._is_fifo:
+            self._fifo_loads += 1
+            self._frame_loads[frame_id] = self._fifo_loads
+            self._fifo_queue.append((self._fifo_loads, frame_id))
+        if self.policy == "LFU":
+            self._push_lfu(frame)
         
-        print(f"📥 LOADED: Page {page_id} into frame {frame_id}")
+        logger.debug("📥 LOADED: Page %d into frame %d", page_id, frame_id)
         return page
     
     def _get_free_frame(self) -> Optional[int]:
         """Get a free frame if available."""
         if self.free_frames:
             frame_id = self.free_frames.pop()
-            print(f"✅ Using free frame {frame_id}")
+            logger.debug("✅ Using free frame %d", frame_id)
             return frame_id
         return None
     
     def _evict_page(self) -> Optional[int]:
         """Evict a page using the configured replacement policy."""
-        if self.policy == "LRU":
+        if self.policy in ("LRU", "TINYLFU"):
             return self._evict_lru()
+        elif self.policy == "LFU":
+            return self._evict_lfu()
         elif self.policy == "CLOCK":
             return self._evict_clock()
+        elif self.policy == "MIDPOINT":
+            return self._evict_midpoint()
         else:
             return self._evict_fifo() # Default to FIFO if unknown policy
         
     def _evict_fifo(self) -> Optional[int]:
-        """FIFO eviction - evict oldest frame by frame_id."""
-        for frame in self.frames:
-            if frame.page is not None:
-                self._write_back_and_clear_frame(frame.frame_id)
-                return frame.frame_id
+        """
+        FIFO eviction - evict the page that was loaded first.
+        
+        Loads are queued in order, so the victim is the head of the queue:
+        O(1), and independent of which frame a page happens to sit in.
+        Entries whose load has already left its frame some other way (a
+        scan ring recycling it, even if the same page was loaded there
+        again later) are skipped.
+        
+        Returns:
+            frame_id of evicted frame, or None if no frame can be evicted
+        """
+        while self._fifo_queue:
+            load, frame_id = self._fifo_queue.popleft()
+            if self._frame_loads[frame_id] == load:
+                self._write_back_and_clear_frame(frame_id)
+                return frame_id
         return None
     
     
     def _evict_clock(self) -> Optional[int]:
-        """Clock/Second Chance eviction algorithm."""
-        start_hand = self.clock_hand
+        """
+        Clock sweep eviction, with usage counts as in PostgreSQL.
         
-        while True:
-            # Get the current frame to check
-            frame = self.frames[self.clock_hand]
-            
-            # increment clock hand
-            self.clock_hand = (self.clock_hand + 1) % self.pool_size
-
-            if frame.is_free():
-                return frame.frame_id
-            
-            if frame.clock_bit:
-                # Give second chance - reset clock bit and move to next frame
-                frame.clock_bit = False
-                print(f"🔄 CLOCK: Frame {frame.frame_id} given second chance")
-            else:
-                if frame.page is not None:
-                    self._write_back_and_clear_frame(frame.frame_id)
-                    return frame.frame_id
-            
-            # Avoid infinite loop
-            if self.clock_hand == start_hand:
-                break
+        Instead of a single reference bit, each frame has a usage count: 1
+        when its page is loaded, +1 per hit, up to MAX_USAGE_COUNT. The hand
+        sweeps forward from where it stopped last time, decrementing every
+        nonzero count it passes (another chance, fewer for colder pages);
+        the first frame it finds at 0 is the victim. Pages hit often thus
+        survive several sweeps, so hot pages outlast a scan passing through.
         
-        return None
+        The sweep is done with bytearray operations instead of one Python
+        step per frame: if every count is at least m, the hand would go
+        round m times decrementing them all, which is a single translate().
+        Then a find() for the next 0 gives the victim, and the frames the
+        hand passed on its way there are decremented once more.
+        
+        Returns:
+            frame_id of evicted frame, or None if no frame can be evicted
+        """
+        counts = self.usage_counts
+        hand = self.clock_hand
+        
+        full_rounds = min(counts)
+        if full_rounds:
+            counts[:] = counts.translate(self._DECREMENT[full_rounds])
+            logger.debug("🔄 CLOCK: %d full sweeps, every usage count decremented", full_rounds)
+        
+        victim = counts.find(0, hand)
+        if victim < 0:
+            # No zero from the hand to the end: they lose one more, and the hand wraps
+            victim = counts.find(0, 0, hand)
+            counts[hand:] = counts[hand:].translate(self._DECREMENT[1])
+            logger.debug("🔄 CLOCK: Frames %d-%d usage count decremented", hand, self.pool_size - 1)
+            hand = 0
+        if victim > hand:
+            counts[hand:victim] = counts[hand:victim].translate(self._DECREMENT[1])
+            logger.debug("🔄 CLOCK: Frames %d-%d usage count decremented", hand, victim - 1)
+        
+        self.clock_hand = (victim + 1) % self.pool_size
+        frame = self.frames[victim]
+        if frame.is_free():
+            return victim
+        self._write_back_and_clear_frame(victim)
+        return victim
     
     def _evict_lru(self) -> Optional[int]:
         """
-        TODO: Implement LRU (Least Recently Used) eviction.
+        LRU (Least Recently Used) eviction.
+        
+        Instead of scanning every frame for the smallest last-access time,
+        self._lru keeps the resident pages in recency order (a hash map plus
+        a linked list, the classic LRU structure): get_page moves a page to
+        the end on every hit, so the least recently used page is always the
+        first one. Finding and removing the victim is O(1).
+        
+        Returns:
+            frame_id of evicted frame, or None if no frame can be evicted
+        """
+        if not self._lru:
+            return None
+        
+        # Oldest entry first; _write_back_and_clear_frame drops it from _lru
+        victim_page_id = next(iter(self._lru))
+        victim_frame_id = self._lru[victim_page_id]
+        self._write_back_and_clear_frame(victim_frame_id)
+        return victim_frame_id
+    
+    def _evict_midpoint(self) -> Optional[int]:
+        """
+        LRU eviction with midpoint insertion, as in InnoDB's buffer pool.
         
-        Find the frame with the smallest last_accessed value.
+        Plain LRU puts a newly loaded page at the most recently used end, so
+        a scan reading many pages once pushes the whole hot set out of the
+        pool. Here the LRU list is split at a midpoint: new pages enter the
+        old sublist (self._old) and only move to the young one (self._lru)
+        when they are hit again. When the young sublist grows past 1 -
+        MIDPOINT_OLD_PCT of the pool, its least recently used page ages
+        back into old. Victims come from the old sublist first, so pages
+        read once leave before any page that was reused. Still O(1).
         
         Returns:
             frame_id of evicted frame, or None if no frame can be evicted
+        """
+        sublist = self._old or self._lru
+        if not sublist:
+            return None
         
-        HINT: 
-        1. Loop through self.frames
-        2. For each frame, check if it has a page
-        3. Track the frame with the smallest last_accessed time
-        4. Call self._write_back_and_clear_frame(frame_id) to evict it
-        5. Return the frame_id
+        # Oldest entry first; _write_back_and_clear_frame drops it from its sublist
+        victim_page_id = next(iter(sublist))
+        victim_frame_id = sublist[victim_page_id]
+        self._write_back_and_clear_frame(victim_frame_id)
+        return victim_frame_id
+    
+    def _push_lfu(self, frame: BufferFrame):
+        """Record an access to the page in frame in the LFU heap."""
+        self._lfu_tick += 1
+        frame.last_accessed = self._lfu_tick
+        heapq.heappush(self._lfu_heap, (frame.access_frequency, frame.last_accessed, frame.page_id))
+        
+        # Every hit leaves a stale entry behind: rebuild from the resident
+        # pages before the heap grows past a few entries per frame
+        if len(self._lfu_heap) > 4 * self.pool_size:
+            self._lfu_heap = [(f.access_frequency, f.last_accessed, f.page_id)
+                              for f in self.frames if f.page is not None]
+            heapq.heapify(self._lfu_heap)
+    
+    def _evict_lfu(self) -> Optional[int]:
         """
+        LFU (Least Frequently Used) eviction, least recently used among ties.
         
-        # TODO: Implement LRU eviction logic here
-        # Remove the 'pass' statement and add your implementation
+        Instead of scanning every frame for the smallest access_frequency,
+        each load and hit pushes (access_frequency, tick, page_id) onto a
+        min-heap. Old entries are not removed when a page's frequency goes
+        up (lazy deletion): popping skips every entry whose page has left
+        the pool or been accessed again since. Eviction is O(log N) amortized.
         
-        victim_frame_id = None
-        oldest_access_time = float('inf')
+        Returns:
+            frame_id of evicted frame, or None if no frame can be evicted
+        """
+        while self._lfu_heap:
+            frequency, tick, page_id = heapq.heappop(self._lfu_heap)
+            frame_id = self.page_table.get(page_id)
+            if frame_id is None:
+                continue  # Page already evicted
+            frame = self.frames[frame_id]
+            # Only the entry pushed by the page's latest access is current
+            if (frame.access_frequency, frame.last_accessed) == (frequency, tick):
+                self._write_back_and_clear_frame(frame_id)
+                return frame_id
+        return None
+    
+    def _sketch_slots(self, page_id: int) -> List[int]:
+        """Sketch counter of page_id in each row (multiply-shift hashing)."""
+        shift = 32 - self._sketch_bits
+        width = self._sketch_width
+        return [row * width + (((page_id * seed) & 0xFFFFFFFF) >> shift)
+                for row, seed in enumerate(self._SKETCH_SEEDS)]
+    
+    def _sketch_add(self, page_id: int):
+        """Count one access to page_id in the frequency sketch."""
+        sketch = self._sketch
+        slots = self._sketch_slots(page_id)
+        # Conservative update: only raise the counters at the minimum, which
+        # keeps the overestimate from hash collisions as small as possible
+        low = min(sketch[slot] for slot in slots)
+        if low < self.SKETCH_MAX_COUNT:
+            for slot in slots:
+                if sketch[slot] == low:
+                    sketch[slot] = low + 1
         
-        # Find the least recently used frame
-        ...
+        # Aging: halve every counter periodically, so frequencies follow the
+        # recent workload instead of all history
+        self._sketch_additions += 1
+        if self._sketch_additions >= self.SKETCH_SAMPLE_FACTOR * self.pool_size:
+            self._sketch = sketch.translate(self._HALVE)
+            self._sketch_additions = 0
+    
+    def _sketch_estimate(self, page_id: int) -> int:
+        """Estimated recent access count of page_id (never an underestimate)."""
+        sketch = self._sketch
+        return min(sketch[slot] for slot in self._sketch_slots(page_id))
+    
+    def _admit(self, page_id: int, victim_page_id: int) -> bool:
+        """
+        TinyLFU admission: should page_id replace victim_page_id in the pool?
         
-        # remember to evict the page...
-        if victim_frame_id is not None:
-            ...
+        A full pool is only worth changing if the incoming page is used
+        more often than the page LRU would evict for it. Pages read once,
+        like those of a scan, lose against any page that has been hit, so
+        they no longer push the hot set out of the pool.
+        
+        Args:
+            page_id: Page that missed
+            victim_page_id: Page the replacement policy would evict
             
-        return victim_frame_id
-        # return 0  # Placeholder - replace with your implementation
+        Returns:
+            bool: True if page_id should be cached
+        """
+        return self._sketch_estimate(page_id) > self._sketch_estimate(victim_page_id)
     
     def _write_back_and_clear_frame(self, frame_id: int):
         """
@@ -264,12 +656,16 @@ class BufferManager:
         
         # Write back if dirty
         if frame.is_dirty and frame.page:
-            print(f"💾 WRITE-BACK: Dirty page {frame.page_id}")
+            logger.debug("💾 WRITE-BACK: Dirty page %d", frame.page_id)
             self.disk.write_page(frame.page)
         
         # Remove from page table
         if frame.page_id is not None and frame.page_id in self.page_table:
             del self.page_table[frame.page_id]
+        self._lru.pop(frame.page_id, None)
+        self._old.pop(frame.page_id, None)
+        self.usage_counts[frame_id] = 0
+        self._frame_loads[frame_id] = 0
         
         # Clear frame
         old_page_id = frame.page_id
@@ -279,7 +675,7 @@ class BufferManager:
         frame.access_frequency = 0
         
         self.evictions += 1
-        print(f"🗑️  EVICTED: Page {old_page_id} from frame {frame_id}")
+        logger.debug("🗑️  EVICTED: Page %s from frame %d", old_page_id, frame_id)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get buffer manager statistics for analysis."""
@@ -291,6 +687,7 @@ class BufferManager:
             'misses': self.misses,
             'hit_rate': hit_rate,
             'evictions': self.evictions,
+            'rejections': self.rejections,
             'total_accesses': total_accesses,
             'frames_used': len(self.page_table),
             'frames_free': len(self.free_frames),
@@ -315,14 +712,17 @@ class BufferManager:
     
     def flush_all_dirty_pages(self):
         """Write all dirty pages back to disk."""
-        dirty_count = 0
-        for frame in self.frames:
-            if frame.is_dirty and frame.page:
-                self.disk.write_page(frame.page)
+        dirty_frames = [frame for frame in self.frames if frame.is_dirty and frame.page]
+        dirty_count = len(dirty_frames)
+        
+        # Hand all dirty pages to the disk manager at once, so adjacent pages
+        # are written together in a few batched syscalls
+        if dirty_frames and self.disk.write_pages(frame.page for frame in dirty_frames):
+            for frame in dirty_frames:
                 frame.is_dirty = False
-                dirty_count += 1
         
         if dirty_count > 0:
+            self.disk.sync()  # One fsync for the whole batch
             print(f"💾 Flushed {dirty_count} dirty pages to disk")
 
 
@@ -333,39 +733,96 @@ class BufferedQueryEngine:
     This shows how applications use the buffer manager to get better performance.
     """
     
-    def __init__(self, buffer_manager: BufferManager, num_pages: int):
+    def __init__(self, buffer_manager: BufferManager, num_pages: int, use_scan_ring: bool = False):
+        """
+        Args:
+            buffer_manager: Buffer pool the queries read through
+            num_pages: Number of pages in the table
+            use_scan_ring: Read table scans through a small ring of frames
+                (BufferManager.get_page_for_scan) so they do not flush the pool
+        """
         self.buffer = buffer_manager
         self.num_pages = num_pages
+        self._get_page = buffer_manager.get_page_for_scan if use_scan_ring else buffer_manager.get_page
+        # Every query is a full scan in page order, so the misses are too:
+        # let the OS read ahead, like the naive engine does
+        buffer_manager.disk.advise_sequential()
         print(f"🚀 Buffered Query Engine initialized with {buffer_manager.pool_size}-page buffer")
     
-    def full_table_scan(self) -> List:
-        """Scan all pages using buffer manager."""
+    def full_table_scan(self) -> Iterator[Order]:
+        """Scan all pages using buffer manager, yielding their orders page by page."""
         print(f"🔍 Buffered scan of {self.num_pages} pages...")
-        all_orders = []
+        num_orders = 0
+        
+        start_time = time.perf_counter()
+        
+        for page_id in range(self.num_pages):
+            page = self._get_page(page_id)
+            if page:
+                num_orders += page.num_records
+                yield from page.orders
+        
+        scan_time = time.perf_counter() - start_time
+        print(f"   Buffered scan completed: {num_orders} orders in {scan_time:.3f}s")
+    
+    def scan_columns(self, *fields: str) -> Tuple[List[int], ...]:
+        """
+        Scan all pages and return only the requested order fields, column by column.
+        
+        Reads the same pages as full_table_scan, but copies each field straight
+        out of the page buffer (DiskPage.column) instead of building an Order
+        object per record, so a query only pays for the columns it uses.
+        
+        Args:
+            fields: Field names from ORDER_FIELDS (e.g. 'customer_id', 'price_cents')
+            
+        Returns:
+            One list per field, aligned by order
+        """
+        print(f"🔍 Buffered scan of {self.num_pages} pages ({', '.join(fields)})...")
+        columns = tuple([] for _ in fields)
         
         start_time = time.perf_counter()
         
         for page_id in range(self.num_pages):
-            page = self.buffer.get_page(page_id)
+            page = self._get_page(page_id)
             if page:
-                all_orders.extend(page.orders)
+                for column, field in zip(columns, fields):
+                    column.extend(page.column(field))
         
         scan_time = time.perf_counter() - start_time
-        print(f"   Buffered scan completed: {len(all_orders)} orders in {scan_time:.3f}s")
+        print(f"   Buffered scan completed: {len(columns[0]) if columns else 0} orders in {scan_time:.3f}s")
+        
+        return columns
+    
+    def scan_pages(self) -> Iterator[DiskPage]:
+        """
+        Scan all pages using buffer manager, yielding the pages themselves.
+        
+        The queries hand these to the scan kernels (scan.group_sum), which
+        aggregate straight from the page buffers: no per-order Python loop.
+        """
+        print(f"🔍 Buffered scan of {self.num_pages} pages...")
+        start_time = time.perf_counter()
+        
+        for page_id in range(self.num_pages):
+            page = self._get_page(page_id)
+            if page:
+                yield page
         
-        return all_orders
+        scan_time = time.perf_counter() - start_time
+        print(f"   Buffered scan completed in {scan_time:.3f}s")
     
     def monthly_revenue_analysis(self) -> Dict[int, float]:
         """Calculate monthly revenue using buffer manager."""
         print("\n📊 Query 1: Monthly Revenue Analysis (Buffered)")
         start_time = time.perf_counter()
         
-        orders = self.full_table_scan()
+        # Revenue per order_date // 30, summed in exact integer cents
+        revenue, order_counts = group_sum(self.scan_pages(), 'order_date', 'price_cents', 30)
         
-        monthly_revenue = {}
-        for order in orders:
-            month = order.order_date // 30
-            monthly_revenue[month] = monthly_revenue.get(month, 0) + order.price
+        # Convert to dollars once per group
+        monthly_revenue = {month: cents / 100 for month, cents in enumerate(revenue) if order_counts[month]}
         
         query_time = time.perf_counter() - start_time
         print(f"✅ Monthly revenue analysis completed in {query_time:.3f}s")
@@ -377,13 +834,13 @@ class BufferedQueryEngine:
         print(f"\n📊 Query 2: Top {limit} Customers Analysis (Buffered)")
         start_time = time.perf_counter()
         
-        orders = self.full_table_scan()
-        
-        customer_spending = {}
-        for order in orders:
-            customer_spending[order.customer_id] = customer_spending.get(order.customer_id, 0) + order.price
+        # Customer IDs are small dense integers: the kernel sums into an array indexed by ID
+        customer_spending, _ = group_sum(self.scan_pages(), 'customer_id', 'price_cents')
         
-        top_customers = sorted(customer_spending.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top_customers = heapq.nlargest(limit, ((customer_id, cents) for customer_id, cents
+                                               in enumerate(customer_spending) if cents),
+                                       key=lambda x: x[1])
+        top_customers = [(customer_id, cents / 100) for customer_id, cents in top_customers]
         
         query_time = time.perf_counter() - start_time
         print(f"✅ Top customers analysis completed in {query_time:.3f}s")
@@ -395,13 +852,11 @@ class BufferedQueryEngine:
         print(f"\n📊 Query 3: Top {limit} Products Analysis (Buffered)")
         start_time = time.perf_counter()
         
-        orders = self.full_table_scan()
-        
-        product_sales = {}
-        for order in orders:
-            product_sales[order.product_id] = product_sales.get(order.product_id, 0) + order.quantity
+        product_sales, _ = group_sum(self.scan_pages(), 'product_id', 'quantity')
         
-        top_products = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top_products = heapq.nlargest(limit, ((product_id, quantity) for product_id, quantity
+                                              in enumerate(product_sales) if quantity),
+                                      key=lambda x: x[1])
         
         query_time = time.perf_counter() - start_time
         print(f"✅ Product popularity analysis completed in {query_time:.3f}s")
@@ -413,37 +868,73 @@ class BufferedQueryEngine:
         print("\n📊 Query 4: Regional Sales Analysis (Buffered)")
         start_time = time.perf_counter()
         
-        orders = self.full_table_scan()
+        region_revenue, region_orders = group_sum(self.scan_pages(), 'region', 'price_cents')
         
+        # Calculate averages
         regional_stats = {}
-        for order in orders:
-            if order.region not in regional_stats:
-                regional_stats[order.region] = {
-                    'total_revenue': 0,
-                    'order_count': 0,
-                    'avg_order_value': 0
+        for region, order_count in enumerate(region_orders):
+            if order_count:
+                total_revenue = region_revenue[region] / 100  # Cents to dollars
+                regional_stats[region] = {
+                    'total_revenue': total_revenue,
+                    'order_count': order_count,
+                    'avg_order_value': total_revenue / order_count
                 }
-            
-            regional_stats[order.region]['total_revenue'] += order.price
-            regional_stats[order.region]['order_count'] += 1
-        
-        # Calculate averages
-        for region in regional_stats:
-            stats = regional_stats[region]
-            stats['avg_order_value'] = stats['total_revenue'] / stats['order_count']
         
         query_time = time.perf_counter() - start_time
         print(f"✅ Regional sales analysis completed in {query_time:.3f}s")
         
         return regional_stats
+    
+    def run_all_queries(self, limit: int = 10) -> Dict[str, object]:
+        """
+        Compute all four dashboard queries in a single buffered scan.
+        
+        Query fusion, as in step 2's run_all_analytics: every page is fetched
+        through the buffer manager once and fed to one fused kernel
+        (scan.aggregate_dashboard) that updates all four aggregates. When the
+        pool is smaller than the table, the separate queries miss on every
+        page of every scan; fused, there is a single scan to miss on.
+        
+        Args:
+            limit: Number of top customers / products to return
+            
+        Returns:
+            dict: monthly_revenue, top_customers, top_products and
+            regional_stats, in the same format as the individual queries
+        """
+        print("\n📊 Fused Query: all dashboard aggregates in one buffered scan")
+        start_time = time.perf_counter()
+        
+        results = dashboard_results(aggregate_dashboard(self.scan_pages()), limit)
+        
+        query_time = time.perf_counter() - start_time
+        print(f"✅ Fused analysis completed in {query_time:.3f}s")
+        
+        return results
 
 
-def run_buffered_analytics_dashboard(query_engine: BufferedQueryEngine):
+def run_buffered_analytics_dashboard(query_engine: BufferedQueryEngine, fused: bool = False,
+                                     parallel: bool = False):
     """
     Run analytics dashboard with buffer manager.
     
     Students will see dramatic performance improvement compared to step 2!
+    
+    Args:
+        query_engine: Engine to run the queries on
+        fused: Compute all queries in a single scan (run_all_queries)
+            instead of one scan per query
+        parallel: Run the four queries concurrently in a thread pool over the
+            shared buffer pool, which must be thread_safe. The threads overlap
+            where the GIL is released: page reads and the numba kernels.
+            
+    Raises:
+        ValueError: If parallel is requested on a buffer manager that is not thread_safe
     """
+    if parallel and query_engine.buffer._lock is None:
+        raise ValueError("parallel=True needs a BufferManager created with thread_safe=True")
+    
     print(f"\n{'='*70}")
     print("🚀 RUNNING E-COMMERCE ANALYTICS DASHBOARD (BUFFERED VERSION)")
     print(f"{'='*70}")
@@ -453,15 +944,33 @@ def run_buffered_analytics_dashboard(query_engine: BufferedQueryEngine):
     query_engine.buffer.hits = 0
     query_engine.buffer.misses = 0
     query_engine.buffer.evictions = 0
+    query_engine.buffer.rejections = 0
     query_engine.buffer.disk.reset_stats()
     
     dashboard_start = time.perf_counter()
     
     # Run the same analytics queries
-    monthly_revenue = query_engine.monthly_revenue_analysis()
-    top_customers = query_engine.top_customers_analysis()
-    top_products = query_engine.product_popularity_analysis()
-    regional_stats = query_engine.regional_sales_analysis()
+    if fused:
+        results = query_engine.run_all_queries()
+        monthly_revenue = results['monthly_revenue']
+        top_customers = results['top_customers']
+        top_products = results['top_products']
+        regional_stats = results['regional_stats']
+    elif parallel:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            monthly_future = executor.submit(query_engine.monthly_revenue_analysis)
+            customers_future = executor.submit(query_engine.top_customers_analysis)
+            products_future = executor.submit(query_engine.product_popularity_analysis)
+            regional_future = executor.submit(query_engine.regional_sales_analysis)
+            monthly_revenue = monthly_future.result()
+            top_customers = customers_future.result()
+            top_products = products_future.result()
+            regional_stats = regional_future.result()
+    else:
+        monthly_revenue = query_engine.monthly_revenue_analysis()
+        top_customers = query_engine.top_customers_analysis()
+        top_products = query_engine.product_popularity_analysis()
+        regional_stats = query_engine.regional_sales_analysis()
     
     dashboard_time = time.perf_counter() - dashboard_start
     
@@ -511,6 +1020,11 @@ def run_buffered_analytics_dashboard(query_engine: BufferedQueryEngine):
     print(f"   Evictions: {buffer_stats['evictions']:,}")
     print(f"   Frames Used: {buffer_stats['frames_used']}/{query_engine.buffer.pool_size}")
     
+    if fused:
+        print(f"\n✅ QUERY FUSION:")
+        print(f"   • One buffered scan of {query_engine.num_pages:,} pages served all 4 queries")
+        print(f"   • {buffer_stats['total_accesses']:,} page requests instead of {4 * query_engine.num_pages:,}")
+    
     return {
         'dashboard_time': dashboard_time,
         'disk_stats': disk_stats,
@@ -564,6 +1078,9 @@ def main():
     print(f"\n🚀 Creating buffer manager...")
     disk_manager = DiskManager(database_file)
     buffer_manager = BufferManager(disk_manager, pool_size, policy="LRU")
+    # buffer_manager = BufferManager(disk_manager, pool_size, policy="LFU")
+    # buffer_manager = BufferManager(disk_manager, pool_size, policy="TINYLFU")
+    # buffer_manager = BufferManager(disk_manager, pool_size, policy="MIDPOINT")
     # buffer_manager = BufferManager(disk_manager, pool_size, policy="CLOCK")
     # buffer_manager = BufferManager(disk_manager, pool_size, policy="FIFO")
     query_engine = BufferedQueryEngine(buffer_manager, num_pages)
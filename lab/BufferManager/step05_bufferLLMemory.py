@@ -20,21 +20,30 @@ or old sessions), and the system learns to prioritize active users and important
 This models how modern LLM-based systems balance relevance, freshness, and fairness in multi-user environments with constrained memory.
 """
 
+import asyncio
+import heapq
+import logging
 import time
 import random
 import os
-from typing import Dict, List, Optional, Set, Any
-from enum import Enum
+from typing import Dict, List, Optional, Set, Any, Tuple
+from enum import IntEnum
+from itertools import accumulate
 from dataclasses import dataclass
-from datetime import datetime, timedelta
 
 # Import existing infrastructure
 from base_data_struct import DiskPage
 from disk_manager import DiskManager
 from step03_with_buffer_manager import BufferManager, BufferFrame
 
+# Per-access messages are logged at DEBUG level, as in step 3: the simulation
+# makes thousands of accesses per second, and printing each one would cost
+# more than the buffer manager itself. To watch them:
+#   logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+logger = logging.getLogger(__name__)
 
-class PageType(Enum):
+
+class PageType(IntEnum):
     """Types of memory pages in LLM system"""
     USER_PREFERENCES = 1      # Highest priority
     RECENT_CONVERSATION = 2   # High priority  
@@ -48,19 +57,29 @@ class UserSession:
     """Represents an active user session"""
     user_id: str
     session_id: str
-    last_activity: datetime
+    last_activity: int  # Logical clock tick of the user's last page access
     is_active: bool = True
     allocated_pages: int = 0
     
-    def mark_activity(self):
+    def mark_activity(self, tick: int):
         """Mark user as recently active"""
-        self.last_activity = datetime.now()
+        self.last_activity = tick
         self.is_active = True
 
 
 class LLMPage(DiskPage):
     """Extended page class with user and priority information"""
     
+    # Priority score of each page type (higher = more important), built once
+    # for the class rather than on every page construction
+    PRIORITIES = {
+        PageType.USER_PREFERENCES: 100,
+        PageType.RECENT_CONVERSATION: 80,
+        PageType.USER_FACTS: 60,
+        PageType.OLD_CONVERSATION: 40,
+        PageType.SESSION_STATE: 20
+    }
+    
     def __init__(self, page_id: int, user_id: str, page_type: PageType, content: str = ""):
         super().__init__(page_id)
         self.user_id = user_id
@@ -68,16 +87,23 @@ class LLMPage(DiskPage):
         self.content = content
         self.priority = self._get_priority()
     
+    def reuse(self, page_id: int, user_id: str, page_type: PageType, content: str = ""):
+        """
+        Turn this page into a new, empty LLM page in place (see DiskPage.reset).
+        
+        Lets the buffer manager refill the page object a frame already holds
+        on every miss, instead of allocating a new one. Only reuse a page
+        nobody else still reads.
+        """
+        self.reset(page_id)
+        self.user_id = user_id
+        self.page_type = page_type
+        self.content = content
+        self.priority = self._get_priority()
+    
     def _get_priority(self) -> int:
         """Get priority score (higher = more important)"""
-        priority_map = {
-            PageType.USER_PREFERENCES: 100,
-            PageType.RECENT_CONVERSATION: 80,
-            PageType.USER_FACTS: 60,
-            PageType.OLD_CONVERSATION: 40,
-            PageType.SESSION_STATE: 20
-        }
-        return priority_map[self.page_type]
+        return self.PRIORITIES[self.page_type]
     
     def __str__(self) -> str:
         return f"LLMPage(id={self.page_id}, user={self.user_id}, type={self.page_type.name})"
@@ -91,15 +117,18 @@ class ExtendedBufferFrame(BufferFrame):
         self.user_id: Optional[str] = None
         self.page_type: Optional[PageType] = None
         self.priority: int = 0
+        self.generation: int = 0  # Bumped on every change, invalidates older eviction heap entries
+        self.prev_accessed: int = 0  # Tick of the access before last_accessed (0: none yet)
     
-    def load_llm_page(self, page: LLMPage):
-        """Load an LLM page and track user/priority info"""
+    def load_llm_page(self, page: LLMPage, tick: int):
+        """Load an LLM page and track user/priority info (tick: logical clock of the access)"""
         self.page = page
         self.page_id = page.page_id
         self.user_id = page.user_id
         self.page_type = page.page_type
         self.priority = page.priority
-        self.last_accessed = datetime.now()
+        self.last_accessed = tick
+        self.prev_accessed = 0
         self.access_frequency = 1
         self.is_dirty = False
     
@@ -110,6 +139,7 @@ class ExtendedBufferFrame(BufferFrame):
         self.user_id = None
         self.page_type = None
         self.priority = 0
+        self.prev_accessed = 0
         self.is_dirty = False
         self.access_frequency = 0
 
@@ -118,16 +148,18 @@ class UserAwareBufferManager(BufferManager):
     """
     Extended buffer manager with user session tracking and priority-based eviction.
     
-    🎯 IMPLEMENTATION TASK:
-    Complete the _evict_user_aware_lru() method to implement:
+    The _evict_user_aware_lru() method implements:
     1. Prefer evicting inactive users over active users
     2. Within same activity level, evict lower priority pages first
-    3. Within same priority, use LRU (least recently used)
+    3. Within same priority, use LRU-2 (oldest second-to-last access)
+    
+    Instead of scanning every frame on every miss, frames are kept in one
+    min-heap per tier (is_active, priority), ordered by their accesses.
     """
     
-    def __init__(self, disk_manager: DiskManager, pool_size: int):
+    def __init__(self, disk_manager: DiskManager, pool_size: int, thread_safe: bool = False):
         # Initialize parent BufferManager
-        super().__init__(disk_manager, pool_size, policy="USER_AWARE")
+        super().__init__(disk_manager, pool_size, policy="USER_AWARE", thread_safe=thread_safe)
         
         # Replace frames with extended versions
         self.frames = [ExtendedBufferFrame(i) for i in range(pool_size)]
@@ -135,55 +167,135 @@ class UserAwareBufferManager(BufferManager):
         # User session management
         self.user_sessions: Dict[str, UserSession] = {} # Tracks active user sessions
         self.user_allocations: Dict[str, int] = {} # Tracks page allocations per user
-        self.activity_timeout = timedelta(minutes=5) # Active if no activity for 5 minutes
+        # Time is a logical clock, one tick per page access: cheaper than a
+        # datetime per access, and independent of how fast the workload runs
+        self._clock = 0
+        self.activity_timeout_ticks = 1000 # Active if any access in the last 1000 accesses
+        # Min-heap of (expiry_tick, user_id), one entry per registered activity.
+        # Only the entry matching a session's last activity is live
+        self._session_expiry: List[Tuple[int, str]] = []
+        
+        # Eviction tiers: (is_active, priority) -> min-heap of
+        # (prev_accessed, last_accessed, seq, frame_id, generation). Entries are
+        # never removed when a frame changes; they go stale instead (see _evict_user_aware_lru)
+        self._tier_heaps: Dict[Tuple[bool, int], List[Tuple[int, int, int, int, int]]] = {}
+        self._tier_entries = 0
+        self._tier_seq = 0  # Tie-breaker, so entries never compare frame data
+        self._tier_activity: Dict[str, bool] = {}  # Activity each user's entries were filed under
         
         # Extended statistics
         self.active_user_evictions = 0
         
         print(f"🧠 User-Aware Buffer Manager initialized:")
         print(f"   Pool size: {pool_size} frames")
-        print(f"   Activity timeout: {self.activity_timeout}")
+        print(f"   Activity timeout: {self.activity_timeout_ticks} accesses")
     
     def register_user_activity(self, user_id: str):
         """Register user activity"""
         if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = UserSession(user_id, "default", datetime.now())
+            self.user_sessions[user_id] = UserSession(user_id, "default", self._clock)
             self.user_allocations[user_id] = 0
         else:
-            self.user_sessions[user_id].mark_activity()
+            self.user_sessions[user_id].mark_activity(self._clock)
+        
+        # A returning user becomes active right away; expiry is handled below
+        if self._tier_activity.get(user_id, True) is not True:
+            self._retier_user(user_id)
+        heapq.heappush(self._session_expiry, (self._clock + self.activity_timeout_ticks, user_id))
         
         self._update_active_status()
     
     def _update_active_status(self):
-        """Update which users are considered active"""
-        current_time = datetime.now()
-        for user_id, session in self.user_sessions.items():
-            time_since_activity = current_time - session.last_activity
-            session.is_active = time_since_activity <= self.activity_timeout
+        """
+        Update which users are considered active.
+        
+        Users only turn inactive when their timeout passes, so instead of
+        re-checking every session, pop the expiry heap up to the current tick.
+        Most calls find nothing due and return after a single comparison.
+        """
+        expiry = self._session_expiry
+        while expiry and expiry[0][0] < self._clock:
+            expires_at, user_id = heapq.heappop(expiry)
+            session = self.user_sessions[user_id]
+            if session.last_activity + self.activity_timeout_ticks != expires_at:
+                continue  # Stale: the user has been active since
+            session.is_active = False
+            if self._tier_activity.get(user_id, False):
+                self._retier_user(user_id)
+    
+    def _push_tier(self, frame: ExtendedBufferFrame):
+        """File the current state of a frame in its eviction tier."""
+        session = self.user_sessions.get(frame.user_id)
+        is_active = session.is_active if session else False
+        self._tier_activity[frame.user_id] = is_active
+        
+        frame.generation += 1
+        self._tier_seq += 1
+        heapq.heappush(self._tier_heaps.setdefault((is_active, frame.priority), []),
+                       (frame.prev_accessed, frame.last_accessed, self._tier_seq, frame.frame_id, frame.generation))
+        self._tier_entries += 1
+        
+        # Hits leave stale entries behind: rebuild from the resident frames
+        # before the heaps grow past a few entries per frame
+        if self._tier_entries > 4 * self.pool_size:
+            self._tier_heaps = {}
+            self._tier_entries = 0
+            for resident in self.frames:
+                if resident.page is not None:
+                    session = self.user_sessions.get(resident.user_id)
+                    self._tier_seq += 1
+                    self._tier_heaps.setdefault((session.is_active if session else False, resident.priority), []).append(
+                        (resident.prev_accessed, resident.last_accessed, self._tier_seq,
+                         resident.frame_id, resident.generation))
+                    self._tier_entries += 1
+            for heap in self._tier_heaps.values():
+                heapq.heapify(heap)
+    
+    def _retier_user(self, user_id: str):
+        """Move a user's pages to the tiers of their new activity status."""
+        for frame in self.frames:
+            if frame.page is not None and frame.user_id == user_id:
+                self._push_tier(frame)
+        self._tier_activity[user_id] = self.user_sessions[user_id].is_active
+    
+    def _make_thread_safe(self):
+        """Serialize get_llm_page with self._lock too, like get_page in step 3"""
+        super()._make_thread_safe()
+        lock = self._lock
+        unlocked_get_llm_page = self.get_llm_page
+        
+        def get_llm_page(page_id: int, user_id: str, page_type: PageType) -> Optional[LLMPage]:
+            with lock:
+                return unlocked_get_llm_page(page_id, user_id, page_type)
+        
+        self.get_llm_page = get_llm_page
     
     def get_llm_page(self, page_id: int, user_id: str, page_type: PageType) -> Optional[LLMPage]:
         """
         Get an LLM page, registering user activity.
         This replaces the original get_page() method for LLM-specific usage.
         """
+        self._clock += 1
         self.register_user_activity(user_id)
         
-        # Check if page is in buffer (HIT)
-        if page_id in self.page_table:
-            frame_id = self.page_table[page_id]
+        # Check if page is in buffer (HIT), with a single page table probe
+        frame_id = self.page_table.get(page_id)
+        if frame_id is not None:
             frame = self.frames[frame_id]
             
             # Update access metadata
-            frame.last_accessed = datetime.now()
+            frame.prev_accessed = frame.last_accessed
+            frame.last_accessed = self._clock
             frame.access_frequency += 1
+            self._push_tier(frame)  # The older entry of this frame is now stale
             
             self.hits += 1
-            print(f"🎯 BUFFER HIT: Page {page_id} (user {user_id}, {page_type.name})")
+            logger.debug("🎯 BUFFER HIT: Page %d (user %s, %s)", page_id, user_id, page_type.name)
             return frame.page
         
         # CACHE MISS - load page
         self.misses += 1
-        print(f"❌ BUFFER MISS: Page {page_id} (user {user_id}, {page_type.name})")
+        logger.debug("❌ BUFFER MISS: Page %d (user %s, %s)", page_id, user_id, page_type.name)
         return self._load_llm_page(page_id, user_id, page_type)
     
     def _load_llm_page(self, page_id: int, user_id: str, page_type: PageType) -> Optional[LLMPage]:
@@ -193,23 +305,30 @@ class UserAwareBufferManager(BufferManager):
         if frame_id is None:
             frame_id = self._evict_page()
             if frame_id is None:
-                print(f"❌ ERROR: No frames available for page {page_id}")
+                logger.error("❌ ERROR: No frames available for page %d", page_id)
                 return None
         
-        # Create LLM page (note: no simulation logic here!)
-        page = LLMPage(page_id, user_id, page_type, f"Content for {page_type.name}")
+        # Create LLM page (note: no simulation logic here!), reusing the
+        # page object the frame held before if it has one
+        page = self._page_buffers[frame_id] if self._lock is None else None
+        if page is None:
+            page = LLMPage(page_id, user_id, page_type, f"Content for {page_type.name}")
+        else:
+            page.reuse(page_id, user_id, page_type, f"Content for {page_type.name}")
+        self._page_buffers[frame_id] = page
         
         # Load page into frame
         frame = self.frames[frame_id]
-        frame.load_llm_page(page)
+        frame.load_llm_page(page, self._clock)
         
         # Update tracking
         self.page_table[page_id] = frame_id
+        self._push_tier(frame)
         self.user_allocations[user_id] = self.user_allocations.get(user_id, 0) + 1
         if user_id in self.user_sessions:
             self.user_sessions[user_id].allocated_pages += 1
         
-        print(f"📥 LOADED: {page} into frame {frame_id}")
+        logger.debug("📥 LOADED: %s into frame %d", page, frame_id)
         return page
     
     def _evict_page(self) -> Optional[int]:
@@ -218,63 +337,60 @@ class UserAwareBufferManager(BufferManager):
     
     def _evict_user_aware_lru(self) -> Optional[int]:
         """
-        🎯 TODO: Implement user-aware LRU eviction policy
+        User-aware LRU eviction policy
         
         Policy requirements:
         1. Try to evict from INACTIVE users first
         2. Within same activity level, evict LOWER priority pages first  
-        3. Within same priority level, evict LEAST recently used (oldest last_accessed)
+        3. Within same priority level, evict by LRU-2: the page whose
+           second-to-last access is oldest (prev_accessed). Pages accessed
+           only once count as infinitely old and go first, least recently
+           used among them (last_accessed). A single recent touch therefore
+           no longer ranks a page above pages that are used again and again.
+        
+        The order is exactly the order of the tier keys (is_active, priority)
+        - False before True, low priority before high - followed by the
+        heap order within a tier. So the victim is the top of the first
+        non-empty tier, with no scan over the frames: O(log N).
+        
+        A frame is re-filed (with a new generation) whenever it is hit and
+        whenever its user's activity changes, without removing its older
+        entry: entries whose generation is not the frame's current one are
+        stale and simply discarded when they come up (lazy deletion).
         
         Returns:
             frame_id of evicted frame, or None if no frame can be evicted
-            
-        HINTS:
-        - self._update_active_status() to refresh user activity
-        - Loop through self.frames to find eviction candidates
-        - Check frame.user_id in self.active_users and session.is_active
-        - Use frame.priority and frame.last_accessed for sorting
-        - Call self._write_back_and_clear_frame(frame_id) to evict
-        - Update self.user_allocations when evicting
-        - Track self.active_user_evictions if evicting active user
         """
-        
-        # TODO: Implement the user-aware eviction policy here
-        # For now, fall back to simple LRU as placeholder
-        
         self._update_active_status()
         
-        # Collect eviction candidates
-        candidates = []
-        best_victim_frame: ExtendedBufferFrame = None
-        
-        for frame in self.frames:
-            if frame.page is not None:
-                user_id = frame.user_id
-                active_user_eviction = self.user_sessions[user_id].is_active if user_id in self.user_sessions else False
-                ###
-                # 
-                # --- YOUR CODE HERE ---
-                # 
-                # Implement the logic to select the best victim frame based on:
-                # 1. Prefer inactive users
-                # 2. Lower priority pages
-                # 3. Least recently used
-                # 
-                ###             
+        best_victim_frame: Optional[ExtendedBufferFrame] = None
+        for tier in sorted(self._tier_heaps):
+            heap = self._tier_heaps[tier]
+            while heap:
+                _, _, _, frame_id, generation = heapq.heappop(heap)
+                self._tier_entries -= 1
+                frame = self.frames[frame_id]
+                if frame.page is not None and frame.generation == generation:
+                    best_victim_frame = frame
+                    break
+            if best_victim_frame:
+                break
         
         # If no candidates found, return None
         if not best_victim_frame:
-            print("❌ ERROR: No candidates for eviction found")
+            logger.error("❌ ERROR: No candidates for eviction found")
             return None
         
         ################################################
         ############ Statistics and cleanup ############
         ################################################
+        user_id = best_victim_frame.user_id
+        active_user_eviction = self.user_sessions[user_id].is_active if user_id in self.user_sessions else False
 
         # Track if we evicted an active user (suboptimal)
         if active_user_eviction:
             self.active_user_evictions += 1
-            print(f"⚠️  Evicting active user page (suboptimal!)")
+            logger.debug("⚠️  Evicting active user page (suboptimal!)")
         
         # Update user allocations
         if user_id in self.user_allocations:
@@ -285,8 +401,8 @@ class UserAwareBufferManager(BufferManager):
         # Evict the frame
         self._write_back_and_clear_frame(best_victim_frame.frame_id)
         
-        print(f"🔄 USER-AWARE EVICTION: Frame {best_victim_frame.frame_id} (user {user_id}, "
-              f"priority {best_victim_frame.priority}, active={active_user_eviction})")
+        logger.debug("🔄 USER-AWARE EVICTION: Frame %d (user %s, priority %d, active=%s)",
+                     best_victim_frame.frame_id, user_id, best_victim_frame.priority, active_user_eviction)
         
         return best_victim_frame.frame_id
     
@@ -295,17 +411,18 @@ class UserAwareBufferManager(BufferManager):
         frame = self.frames[frame_id]
         
         if frame.is_dirty and frame.page:
-            print(f"💾 WRITE-BACK: {frame.page}")
+            logger.debug("💾 WRITE-BACK: %s", frame.page)
             # Would write to persistent storage in real system
         
         # Remove from page table
-        if frame.page_id is not None and frame.page_id in self.page_table:
-            del self.page_table[frame.page_id]
+        if frame.page_id is not None:
+            self.page_table.pop(frame.page_id, None)
         
         old_page = frame.page
         frame.clear_frame()  # Use extended clear method
+        frame.generation += 1  # Any eviction heap entry left for this frame is stale
         self.evictions += 1
-        print(f"🗑️  EVICTED: {old_page} from frame {frame_id}")
+        logger.debug("🗑️  EVICTED: %s from frame %d", old_page, frame_id)
     
     def get_extended_stats(self) -> Dict[str, Any]:
         """Get extended statistics including user info"""
@@ -368,7 +485,21 @@ class LLMWorkloadSimulator:
         # Workload configuration
         self.active_user_ratio = 0.7  # 70% requests from active users
         self.page_type_weights = [30, 25, 15, 15, 15]  # Preferences most common
-        self.request_delay_range = (0.01, 0.05)  # 10-50ms between requests
+        self.request_delay_range = (0.01, 0.05)  # 10-50ms between requests (realistic_delays only)
+        self.trace_batch_size = 1000  # Accesses generated at once when running at full speed
+        
+        # Cumulative weights for random.choices, which would otherwise
+        # accumulate the weights again on every call
+        active_users = self.users[:2]
+        user_weights = [(self.active_user_ratio / len(active_users) if user in active_users else 0)
+                        + (1 - self.active_user_ratio) / len(self.users) for user in self.users]
+        self._user_cum_weights = list(accumulate(user_weights))
+        self._page_type_cum_weights = list(accumulate(self.page_type_weights))
+        
+        # page_id of each (user, page type) pair, so that generating an
+        # access is a dict lookup instead of hashing a fresh tuple
+        self._page_ids = {(user_id, page_type): hash((user_id, page_type.value)) % 100
+                          for user_id in self.users for page_type in self.page_types}
     
     def create_realistic_content(self, page_type: PageType, user_id: str) -> str:
         """Generate realistic content for different page types"""
@@ -390,19 +521,41 @@ class LLMWorkloadSimulator:
             user_id = random.choice(self.users)
         
         # Choose page type with realistic weights
-        page_type = random.choices(self.page_types, weights=self.page_type_weights, k=1)[0]
+        page_type = random.choices(self.page_types, cum_weights=self._page_type_cum_weights, k=1)[0]
         
         # Generate page_id based on user and type (ensures some locality)
-        page_id = hash((user_id, page_type.value)) % 100
+        page_id = self._page_ids[(user_id, page_type)]
         
         return page_id, user_id, page_type
     
-    def run_workload_simulation(self, duration: int = 30) -> Dict[str, Any]:
+    def generate_page_accesses(self, count: int) -> List[tuple[int, str, PageType]]:
+        """
+        Generate count page accesses at once, distributed like generate_page_access.
+        
+        Each user's probability is what generate_page_access's two-step choice
+        gives (active_user_ratio for alice and bob, the rest spread over all
+        users), so both draws can be made for the whole batch with two
+        random.choices calls instead of three draws per access.
+        """
+        users = random.choices(self.users, cum_weights=self._user_cum_weights, k=count)
+        page_types = random.choices(self.page_types, cum_weights=self._page_type_cum_weights, k=count)
+        page_ids = self._page_ids
+        return [(page_ids[(user_id, page_type)], user_id, page_type)
+                for user_id, page_type in zip(users, page_types)]
+    
+    def run_workload_simulation(self, duration: int = 30, realistic_delays: bool = False) -> Dict[str, Any]:
         """
         Run a complete LLM workload simulation
         
+        By default pages are requested back to back, from traces generated
+        trace_batch_size accesses at a time, so access_rate measures the
+        buffer manager itself. With realistic_delays, every request is
+        instead followed by a sleep in request_delay_range, like users
+        waiting between prompts: the rate is then set by the sleeps.
+        
         Args:
             duration: Simulation duration in seconds
+            realistic_delays: Sleep between requests
             
         Returns:
             Dictionary with simulation results and metrics
@@ -414,33 +567,35 @@ class LLMWorkloadSimulator:
         print(f"Users: {', '.join(self.users)}")
         print(f"Page types: {len(self.page_types)} types with priorities")
         
-        # Reset statistics
-        self.buffer_manager.hits = 0
-        self.buffer_manager.misses = 0
-        self.buffer_manager.evictions = 0
-        self.buffer_manager.active_user_evictions = 0
+        self._reset_stats()
         
-        start_time = time.time()
+        get_llm_page = self.buffer_manager.get_llm_page
+        start_time = time.perf_counter()
         access_count = 0
         
         # Run simulation loop
-        while time.time() - start_time < duration:
-            # Generate page access
-            page_id, user_id, page_type = self.generate_page_access()
+        while time.perf_counter() - start_time < duration:
+            # Generate page accesses
+            if realistic_delays:
+                trace = [self.generate_page_access()]
+            else:
+                trace = self.generate_page_accesses(self.trace_batch_size)
             
-            # Access the page through buffer manager
-            page = self.buffer_manager.get_llm_page(page_id, user_id, page_type)
-            if page:
-                # Simulate using the page (e.g., in LLM prompt)
-                _ = f"System prompt includes: {page}"
+            for page_id, user_id, page_type in trace:
+                # Access the page through buffer manager
+                page = get_llm_page(page_id, user_id, page_type)
+                if page:
+                    # Simulate using the page (e.g., in LLM prompt)
+                    _ = f"System prompt includes: {page}"
             
-            access_count += 1
+            access_count += len(trace)
             
-            # Realistic delay between requests
-            delay = random.uniform(*self.request_delay_range)
-            time.sleep(delay)
+            if realistic_delays:
+                # Realistic delay between requests
+                delay = random.uniform(*self.request_delay_range)
+                time.sleep(delay)
         
-        elapsed = time.time() - start_time
+        elapsed = time.perf_counter() - start_time
         
         # Collect results
         results = {
@@ -452,6 +607,72 @@ class LLMWorkloadSimulator:
         
         return results
     
+    async def run_concurrent(self, duration: int = 30, n_users: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run the LLM workload with users sending requests at the same time
+        
+        Each of the first n_users users (all by default) is a coroutine that
+        requests a page, then waits a delay in request_delay_range, like
+        run_workload_simulation with realistic_delays. The buffer manager is
+        synchronous, so requests go through a thread pool (asyncio.to_thread):
+        the users' waits overlap, and their requests contend for the pool.
+        Run it with asyncio.run(simulator.run_concurrent(...)).
+        
+        Args:
+            duration: Simulation duration in seconds
+            n_users: Number of concurrent users
+            
+        Returns:
+            Dictionary with simulation results and metrics, as run_workload_simulation
+            
+        Raises:
+            ValueError: If the buffer manager is not thread_safe
+        """
+        if self.buffer_manager._lock is None:
+            raise ValueError("run_concurrent needs a UserAwareBufferManager created with thread_safe=True")
+        
+        users = self.users[:n_users]
+        print(f"\n{'='*60}")
+        print("🧠 CONCURRENT LLM WORKLOAD SIMULATION")
+        print(f"{'='*60}")
+        print(f"Duration: {duration} seconds")
+        print(f"Concurrent users: {', '.join(users)}")
+        
+        self._reset_stats()
+        
+        get_llm_page = self.buffer_manager.get_llm_page
+        start_time = time.perf_counter()
+        
+        async def user_requests(user_id: str) -> int:
+            accesses = 0
+            while time.perf_counter() - start_time < duration:
+                page_type = random.choices(self.page_types, cum_weights=self._page_type_cum_weights, k=1)[0]
+                page_id = self._page_ids[(user_id, page_type)]
+                page = await asyncio.to_thread(get_llm_page, page_id, user_id, page_type)
+                if page:
+                    # Simulate using the page (e.g., in LLM prompt)
+                    _ = f"System prompt includes: {page}"
+                accesses += 1
+                await asyncio.sleep(random.uniform(*self.request_delay_range))
+            return accesses
+        
+        access_counts = await asyncio.gather(*(user_requests(user_id) for user_id in users))
+        elapsed = time.perf_counter() - start_time
+        access_count = sum(access_counts)
+        
+        return {
+            'duration': elapsed,
+            'total_accesses': access_count,
+            'access_rate': access_count / elapsed,
+            'buffer_stats': self.buffer_manager.get_extended_stats()
+        }
+    
+    def _reset_stats(self):
+        self.buffer_manager.hits = 0
+        self.buffer_manager.misses = 0
+        self.buffer_manager.evictions = 0
+        self.buffer_manager.active_user_evictions = 0
+    
     def analyze_results(self, results: Dict[str, Any]):
         """Analyze and display simulation results"""
         print(f"\n📊 SIMULATION RESULTS:")
@@ -0,0 +1,36 @@
+from base_data_struct import DiskPage
+from step03_with_buffer_manager import BufferManager
+
+
+class MemoryDisk:
+    """A disk of empty pages, for exercising the buffer pool alone."""
+
+    def read_page(self, page_id, dest=None):
+        return DiskPage(page_id)
+
+    def write_page(self, page):
+        return True
+
+
+def _scan(buffer, num_pages):
+    for page_id in range(num_pages):
+        assert buffer.get_page_for_scan(page_id) is not None
+
+
+def test_scan_of_table_that_fits_in_pool_hits():
+    buffer = BufferManager(MemoryDisk(), pool_size=200, policy="LRU")
+    _scan(buffer, 138)
+    _scan(buffer, 138)
+
+    assert buffer.misses == 138
+    assert buffer.hits == 138
+
+
+def test_scan_of_larger_table_recycles_its_own_frames():
+    buffer = BufferManager(MemoryDisk(), pool_size=64, policy="LRU")
+    for page_id in range(1000, 1032):
+        buffer.get_page(page_id)
+    _scan(buffer, 500)
+
+    # the pages read by get_page are still resident
+    assert all(page_id in buffer.page_table for page_id in range(1000, 1032))
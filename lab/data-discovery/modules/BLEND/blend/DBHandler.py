@@ -100,7 +100,9 @@ class DBHandler(object):
         """Replaces the 'AllTables' index name"""
         return query.replace("AllTables", f"{self.index_table}")
 
-    def execute_and_fetchall(self, query: str) -> List[Union[Tuple, List]]:
+    def execute_and_fetchall(
+        self, query: str, params: Optional[List] = None
+    ) -> List[Union[Tuple, List]]:
         """Returns results"""
         query = self.clean_query(query)
         query = query.replace("TO_BITSTRING(superkey)", "superkey")
@@ -108,7 +110,7 @@ class DBHandler(object):
         try:
             with duckdb.connect(self.db_path, read_only=True) as connection:
                 with connection.cursor() as cursor:
-                    cursor.execute(query)
+                    cursor.execute(query, params)
                     results = cursor.fetchall()
         except Exception as e:
             print(query)
@@ -190,6 +192,15 @@ class DBHandler(object):
         values = [str(x).replace("'", "") for x in values]
         return "'{}'".format("' , '".join(set(values)))
 
+    @staticmethod
+    def create_sql_list_params(values: Iterable[Any]) -> List[str]:
+        """Same values as create_sql_list_str, to be bound as parameters"""
+        return list({str(x).replace("'", "") for x in values} or {""})
+
+    @staticmethod
+    def create_sql_placeholders(n: int) -> str:
+        return " , ".join(["?"] * n)
+
     @staticmethod
     def create_sql_list_numeric(values: Iterable[Number]) -> str:
         values = [str(x) for x in values]
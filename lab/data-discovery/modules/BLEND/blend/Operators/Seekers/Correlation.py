@@ -96,6 +96,14 @@ class Correlation(Seeker):
             LIMIT $TOPK$
         """
 
+    def run(self, additionals: str = "") -> list:
+        # a candidate column pair needs at least two distinct keys
+        # to pass the HAVING clause, so with fewer keys no result
+        # can come back and the round-trip to the DB is skipped
+        if len(self.input_source) < 2:
+            return []
+        return super().run(additionals)
+
     def create_sql_query(self, db: DBHandler, additionals: str = "") -> str:
         # create an array of 0/1 values, where 1 if the relative target
         # value is above the average of the target numbers, 0 otherwise
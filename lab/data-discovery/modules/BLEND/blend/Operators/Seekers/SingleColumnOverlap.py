@@ -1,14 +1,25 @@
-from typing import Iterable
+from typing import Iterable, List
 
 from ...DBHandler import DBHandler
 from .SeekerBase import Seeker
 
 
 class SingleColumnOverlap(Seeker):
+    # Above this many tokens, run() binds them as a single list
+    # parameter, unnested into a one-column relation that DuckDB
+    # joins against, instead of one placeholder per token
+    LARGE_INPUT_SIZE = 256
+
     def __init__(self, input_query_values: Iterable[str], k: int = 10) -> None:
         super().__init__(k)
 
-        self.input = set(input_query_values)
+        self.input = frozenset(input_query_values)
+
+        # cleaning the values doesn't depend on the DB instance,
+        # so it's done once here rather than on every (re)run
+        cleaned = DBHandler.clean_value_collection(self.input)
+        self._tokens_str = DBHandler.create_sql_list_str(cleaned)
+        self._tokens_params = DBHandler.create_sql_list_params(cleaned)
 
         # The final output results list is sorted by
         # the COUNT(DISTINCT), applying a set semantic
@@ -22,12 +33,30 @@ class SingleColumnOverlap(Seeker):
         LIMIT $TOPK$
         """
 
+    def run(self, additionals: str = "") -> List[int]:
+        # When run on its own the tokens are bound as parameters
+        # rather than inlined, so DuckDB doesn't have to parse a
+        # long literal list; create_sql_query keeps the inlined
+        # form since combiners splice its text into their own SQL
+        tokens = self._tokens_params
+        if len(tokens) > self.LARGE_INPUT_SIZE:
+            placeholders = "SELECT UNNEST(?::VARCHAR[])"
+            params = [tokens]
+        else:
+            placeholders = self.DB.create_sql_placeholders(len(tokens))
+            params = tokens
+
+        sql = self.base_sql.replace("$TOPK$", str(self.k))
+        sql = sql.replace("$ADDITIONALS$", additionals)
+        sql = sql.replace("$TOKENS$", placeholders)
+
+        result = self.DB.execute_and_fetchall(sql, params)
+        return [r for r in result[: self.k]]
+
     def create_sql_query(self, db: DBHandler, additionals: str = "") -> str:
         sql = self.base_sql.replace("$TOPK$", str(self.k))
         sql = sql.replace("$ADDITIONALS$", additionals)
-        sql = sql.replace(
-            "$TOKENS$", db.create_sql_list_str(db.clean_value_collection(self.input))
-        )
+        sql = sql.replace("$TOKENS$", self._tokens_str)
 
         return sql
 
@@ -1,6 +1,4 @@
-import multiprocessing
 import os
-from _thread import LockType
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from inspect import cleandoc
 from numbers import Number
@@ -20,6 +18,10 @@ from .utils import calculate_xash, clean
 
 __all__ = ["BLEND"]
 
+# parsed tables are buffered by the parent process and
+# written with a single INSERT once they reach this size
+INSERT_BATCH_ROWS = 250_000
+
 
 def parse_table(
     table_path: Path,
@@ -146,10 +148,8 @@ def _process_task(
     clean_function_args: dict,
     xash_size: int,
     disable_xash: bool,
-    db_handler: DBHandler,
-    lock: LockType,
 ):
-    table_id, success, df_or_error = parse_table(
+    return parse_table(
         table_path,
         scan_table_opts or {},
         clean_function,
@@ -158,17 +158,6 @@ def _process_task(
         disable_xash,
     )
 
-    if success:
-        # FIX: this sequentialization can be improved
-        with lock:
-            try:
-                db_handler.save_data_to_duckdb(df_or_error)
-                return table_id, True
-            except Exception as e:
-                print(f"Failed insert for table={table_id}, e={e}")
-                return table_id, False
-    return table_id, True
-
 
 class BLEND:
     def __init__(
@@ -232,10 +221,11 @@ class BLEND:
             clean_function = self._clean_function
             clean_function_args = self._clean_function_args
             xash_size = self.xash_size
-            db_handler = self.db_handler
-            manager = multiprocessing.Manager()
-            lock = manager.Lock()
 
+            # workers only parse the tables, while this process is the
+            # single writer: DuckDB allows one writing process at a time,
+            # so the parsed tables are collected here and inserted in
+            # batches instead of one connection per table under a lock
             futures = {
                 executor.submit(
                     _process_task,
@@ -245,13 +235,12 @@ class BLEND:
                     clean_function_args,
                     xash_size,
                     self.disable_xash,
-                    db_handler,
-                    lock,
                 )
                 for table_id in list(table_ids)[:100]
             }
 
             non_empty_tables = 0
+            batch, batch_ids, batch_rows = [], [], 0
 
             for future in tqdm(
                 as_completed(futures),
@@ -260,11 +249,24 @@ class BLEND:
                 disable=False,
             ):
                 try:
-                    table_id, success = future.result()
-                    non_empty_tables += success
+                    table_id, success, df_or_error = future.result()
                 except TimeoutError:
                     continue
 
+                if not success:
+                    continue
+
+                batch.append(df_or_error)
+                batch_ids.append(table_id)
+                batch_rows += df_or_error.shape[0]
+
+                if batch_rows >= INSERT_BATCH_ROWS:
+                    non_empty_tables += self._save_batch(batch, batch_ids)
+                    batch, batch_ids, batch_rows = [], [], 0
+
+            if batch:
+                non_empty_tables += self._save_batch(batch, batch_ids)
+
         end_ins_t = time()
 
         # create indexes
@@ -285,6 +287,27 @@ class BLEND:
         self.db_handler.close()
         return (end_ins_t - start_t, end_idx_t - end_ins_t, end_idx_t - start_t)
 
+    def _save_batch(self, batch: list[pl.DataFrame], table_ids: list[str]) -> int:
+        try:
+            # relaxed, so that a table whose columns got another dtype (e.g. Null
+            # for an all-null column) does not break up the whole batch
+            data = pl.concat(batch, how="vertical_relaxed")
+            self.db_handler.save_data_to_duckdb(data)
+            return len(batch)
+        except Exception:
+            # the batch insert is a single statement, so nothing of it
+            # was stored: retry table by table, to skip only the bad ones
+            pass
+
+        saved = 0
+        for table_id, df in zip(table_ids, batch):
+            try:
+                self.db_handler.save_data_to_duckdb(df)
+                saved += 1
+            except Exception as e:
+                print(f"Failed insert for table={table_id}, e={e}")
+        return saved
+
     def remove_table(self, table_id: str):
         self.db_handler.remove_table_from_index(table_id)
 
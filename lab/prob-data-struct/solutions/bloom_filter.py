@@ -1,4 +1,6 @@
+from array import array
 from math import ceil, e, log
+from typing import Iterable
 
 # You can use the Python Murmurhash implementation
 # the function mmh3.hash() accept a string/bytes object
@@ -7,6 +9,84 @@ from math import ceil, e, log
 # https://pypi.org/project/mmh3/
 import mmh3
 
+# If numba is installed, the loops over the k bit positions are compiled to
+# machine code (see _set_bits and _test_bits); otherwise they run as plain
+# Python, with exactly the same results.
+try:
+    from numba import njit, prange
+
+    HAVE_NUMBA = True
+except ModuleNotFoundError:
+    HAVE_NUMBA = False
+    prange = range
+
+
+# With double hashing, the i-th bit position is (h1 + i * h2) % m. The
+# caller passes h1 and h2 already reduced mod m (h2 != 0 unless m == 1), so
+# the sum stays small and machine integers in the compiled version never
+# overflow.
+
+
+def _set_bits(bits, m: int, k: int, h1: int, h2: int):
+    position = h1
+    for _ in range(k):
+        bits[position >> 3] |= 1 << (position & 7)
+        position += h2
+        if position >= m:
+            position -= m
+
+
+def _test_bits(bits, m: int, k: int, h1: int, h2: int) -> bool:
+    position = h1
+    for _ in range(k):
+        if not bits[position >> 3] & (1 << (position & 7)):
+            return False
+        position += h2
+        if position >= m:
+            position -= m
+    return True
+
+
+if HAVE_NUMBA:
+    _set_bits = njit(cache=True, nogil=True)(_set_bits)
+    _test_bits = njit(cache=True, nogil=True)(_test_bits)
+
+
+def _set_bits_many(bits, m: int, k: int, h1s, h2s):
+    # _set_bits for a whole batch of items, in a single (compiled) call
+    for j in range(len(h1s)):
+        _set_bits(bits, m, k, h1s[j], h2s[j])
+
+
+def _test_bits_many(bits, m: int, k: int, h1s, h2s, found):
+    # _test_bits for a whole batch of items, results are stored in found.
+    # Probes only read the bits and each item writes its own slot of found,
+    # so the items are split across threads (prange); _set_bits_many stays
+    # serial, since two items can set bits in the same byte.
+    for j in prange(len(found)):
+        found[j] = _test_bits(bits, m, k, h1s[j], h2s[j])
+
+
+if HAVE_NUMBA:
+    # numba always comes with NumPy: parallel loops don't accept bytearray
+    # and array arguments, so they are viewed (not copied) as NumPy arrays
+    import numpy as np
+
+    _set_bits_many = njit(cache=True, nogil=True)(_set_bits_many)
+    _test_bits_many_parallel = njit(cache=True, nogil=True, parallel=True)(
+        _test_bits_many
+    )
+
+    def _test_bits_many(bits, m: int, k: int, h1s, h2s, found):
+        _test_bits_many_parallel(
+            np.frombuffer(bits, dtype=np.uint8),
+            m,
+            k,
+            np.frombuffer(h1s, dtype=np.int64),
+            np.frombuffer(h2s, dtype=np.int64),
+            np.frombuffer(found, dtype=np.uint8),
+        )
+
 
 class BloomFilter:
     def __init__(self, n: int, p: float):
@@ -26,16 +106,14 @@ class BloomFilter:
         # number of hash functions
         self.k = self.compute_k(n, self.m)
 
-        # the hash functions used for BF operations
-        #
-        # You can use lambda-functions to define a list of
-        # hash functions, in combination with mmh3.hash
-        self.hash_functions = [
-            lambda x, seed=i: mmh3.hash(x, seed=seed) for i in range(self.k)
-        ]
+        # the k hash functions used for BF operations are derived from a
+        # single 128-bit mmh3 hash (see hashes), so there is nothing
+        # to store for them
 
-        # bitarray (the core structure)
-        self.bitarray = [0 for _ in range(self.m)]
+        # bitarray (the core structure), packed 8 bits per byte:
+        # bit i is bit (i & 7) of byte (i >> 3). A Python list would
+        # spend a whole 8-byte slot on every single bit.
+        self.bitarray = bytearray((self.m + 7) // 8)
 
     def compute_m(self, n: int, p: float) -> int:
         """
@@ -49,25 +127,80 @@ class BloomFilter:
         """
         return ceil((m * log(2, e)) / n)
 
+    def hashes(self, item: str) -> tuple[int, int]:
+        """
+        Return the two base hashes h1, h2 of the input item, modulo m.
+
+        Instead of k independent hash functions, we use double hashing
+        (Kirsch and Mitzenmacher, "Less Hashing, Same Performance"):
+        the i-th hash function is g_i(x) = (h1 + i * h2) % m, where h1 and
+        h2 are the two 64-bit halves of one 128-bit mmh3 hash. The false
+        positive rate is asymptotically the same as with k independent
+        hashes, but each item is hashed only once. The increment h2 must not
+        be 0 (the k positions would all be h1), so it is mapped to 1..m-1.
+        """
+        h1, h2 = mmh3.hash64(item, signed=False)
+        m = self.m
+        return h1 % m, 1 + h2 % (m - 1) if m > 1 else 0
+
+    def _hashes_many(self, items: Iterable[str]) -> tuple[array, array]:
+        # hashes() for a batch of items, as two columns of machine integers
+        m = self.m
+        h1s, h2s = array("q"), array("q")
+        for item in items:
+            h1, h2 = mmh3.hash64(item, signed=False)
+            h1s.append(h1 % m)
+            h2s.append(1 + h2 % (m - 1) if m > 1 else 0)
+        return h1s, h2s
+
     def add(self, item: str) -> bool:
         """
         Add the input item to the filter.
         """
-        for h in self.hash_functions:
-            position = h(item) % self.m
-            self.bitarray[position] = 1
+        h1, h2 = self.hashes(item)
+        _set_bits(self.bitarray, self.m, self.k, h1, h2)
 
         return True
 
+    def add_many(self, items: Iterable[str]) -> int:
+        """
+        Add all the input items to the filter, returning how many were added.
+
+        Same result as calling add() on each item, but the items are hashed
+        in one pass and their bits are then set in one call, instead of one
+        method call (and one compiled call) per item.
+        """
+        h1s, h2s = self._hashes_many(items)
+        _set_bits_many(self.bitarray, self.m, self.k, h1s, h2s)
+        return len(h1s)
+
     def check(self, item: str) -> bool:
         """
         Check if the input item is already present into the filter
         """
-        for h in self.hash_functions:
-            position = h(item) % self.m
-            if not self.bitarray[position]:
-                return False
-        return True
+        h1, h2 = self.hashes(item)
+        return _test_bits(self.bitarray, self.m, self.k, h1, h2)
+
+    def check_many(self, items: Iterable[str]) -> list[bool]:
+        """
+        Check all the input items, returning one result per item (in order).
+
+        Batch counterpart of check(), in the same way as add_many() is
+        for add().
+        """
+        h1s, h2s = self._hashes_many(items)
+        found = bytearray(len(h1s))
+        _test_bits_many(self.bitarray, self.m, self.k, h1s, h2s, found)
+        return [bool(f) for f in found]
+
+    def fill_ratio(self) -> float:
+        """
+        Return the fraction of bits set in the filter.
+
+        The bytes are read as one big integer, so that int.bit_count()
+        does the popcount in C instead of looping over every bit.
+        """
+        return int.from_bytes(self.bitarray, "little").bit_count() / self.m
 
     def delete(self, item: str):
         """
@@ -6,47 +6,96 @@
 # consistent output from the default one: mmh3.hash(x, seed=seed)
 #
 # https://pypi.org/project/mmh3/
+from array import array
+
 import mmh3
 
+# If numba is installed, the loops over the depth rows are compiled to
+# machine code (see _add_counts and _min_count); otherwise they run as plain
+# Python, with exactly the same results.
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ModuleNotFoundError:
+    HAVE_NUMBA = False
+
+
+# The table is stored row after row in one flat array, so the counter of
+# row i and column j is table[i * width + j]. With double hashing, the column
+# of row i is (h1 + i * h2) % width; the caller passes h1 and h2 already
+# reduced mod width, with h2 != 0 (unless width == 1).
+
+
+def _add_counts(table, width: int, depth: int, h1: int, h2: int):
+    column = h1
+    for row in range(depth):
+        table[row * width + column] += 1
+        column += h2
+        if column >= width:
+            column -= width
+
+
+def _min_count(table, width: int, depth: int, h1: int, h2: int) -> int:
+    estimate = table[h1]
+    column = h1
+    for row in range(1, depth):
+        column += h2
+        if column >= width:
+            column -= width
+        estimate = min(estimate, table[row * width + column])
+    return estimate
+
+
+if HAVE_NUMBA:
+    _add_counts = njit(cache=True, nogil=True)(_add_counts)
+    _min_count = njit(cache=True, nogil=True)(_min_count)
+
 
 class CountMinSketch:
     def __init__(self, width: int, depth: int):
         self.width = width
         self.depth = depth
 
-        # the hash functions used for BF operations
-        #
-        # You can use lambda-functions to define a list of
-        # hash functions, in combination with mmh3.hash
-        self.hash_functions = [
-            lambda x, seed=i: mmh3.hash(x, seed=seed) for i in range(depth)
-        ]
+        # the depth hash functions (one per row) are derived from a single
+        # mmh3 hash of the item, see hashes()
+
+        # depth x width unsigned 32-bit counters, row after row: 4 bytes per
+        # counter in one contiguous buffer, instead of a list of Python lists
+        self.table = array("I", bytes(4 * self.width * self.depth))
+
+    def hashes(self, item: str) -> tuple[int, int]:
+        """
+        Return the two base hashes h1, h2 of the item, modulo the table width.
 
-        self.table = [[0 for _ in range(self.width)] for _ in range(self.depth)]
+        Like the Bloom filter, we use double hashing (Kirsch and
+        Mitzenmacher): the column of row i is (h1 + i * h2) % width, where
+        h1 and h2 are the two 64-bit halves of one mmh3 hash, so each item
+        is hashed once instead of once per row. h2 is mapped to 1..width-1:
+        a step of 0 would put the item in the same column on every row,
+        and the minimum over the rows would be no better than one row.
+        """
+        h1, h2 = mmh3.hash64(item, signed=False)
+        width = self.width
+        return h1 % width, 1 + h2 % (width - 1) if width > 1 else 0
 
     def add(self, item: str):
         """
         Add an item to the sketch, updating
         the table with the hash function values.
         """
-        for i in range(self.depth):
-            # we access the i-th row of the table and compute with
-            # the i-th hash function, modulo the table width, the
-            # position we need to update
-            index = self.hash_functions[i](item) % self.width
-            self.table[i][index] += 1
+        # in the i-th row of the table we update the counter at the
+        # position given by the i-th hash function, modulo the table width
+        h1, h2 = self.hashes(item)
+        _add_counts(self.table, self.width, self.depth, h1, h2)
 
     def check(self, item: str) -> int:
         """
         Return the estimated count for the given item
         """
-        values = []
-
-        for i in range(self.depth):
-            index = self.hash_functions[i](item) % self.width
-            values.append(self.table[i][index])
-
-        return min(values)
+        # the smallest of the item's counters is the least overestimated one
+        h1, h2 = self.hashes(item)
+        return _min_count(self.table, self.width, self.depth, h1, h2)
 
     def delete(self, item: str):
         """
@@ -1,4 +1,6 @@
 import random
+from array import array
+from typing import Iterable
 
 import mmh3
 
@@ -21,7 +23,18 @@ class CuckooFilter:
         # and we can collapse these entries in a single bitarray
         # then we can check for each distinct bucket through bits
         # shifting
-        self.buckets = [0 for _ in range(capacity)]
+        #
+        # buckets are stored in a typed array using the smallest unsigned
+        # type that fits a fingerprint (1 byte for 8-bit fingerprints),
+        # instead of one 8-byte pointer to a Python int per bucket
+        typecode = next(
+            (tc for tc in "BHILQ" if array(tc).itemsize * 8 >= fingerprint_length),
+            None,
+        )
+        if typecode is None:
+            self.buckets = [0] * capacity
+        else:
+            self.buckets = array(typecode, bytes(array(typecode).itemsize * capacity))
 
         self.max_kicks = max_kicks
 
@@ -113,6 +126,31 @@ class CuckooFilter:
             return True
         return False
 
+    def check_many(self, items: Iterable[str]) -> list[bool]:
+        """
+        Check all the input items, returning one result per item (in order).
+
+        Same results as check(), but each item is hashed once (the
+        fingerprint and i1 come from the same digest) and the signature
+        of each distinct fingerprint is hashed only the first time.
+        """
+        buckets, capacity = self.buckets, self.capacity
+        max_fingerprint_value = self.max_fingerprint_value
+        signatures = {}
+        found = []
+        for item in items:
+            digest = self._hash(item)
+            f = (digest & max_fingerprint_value) or 1
+
+            hashed_signature = signatures.get(f)
+            if hashed_signature is None:
+                hashed_signature = signatures[f] = self._hash(f) % capacity
+
+            i1 = digest % capacity
+            i2 = (i1 ^ hashed_signature) % capacity
+            found.append(f == buckets[i1] or f == buckets[i2])
+        return found
+
     def delete(self, item: str):
         f = self.fingerprint(item)
         hashed_signature = self._hash(f) % self.capacity
@@ -46,18 +46,22 @@ def test_filter(
     max_fp = len(query_urls) - queries_in_gt
     max_fp_rate = round(max_fp / len(query_urls), 5)
 
-    # add URLs to the filter
-    failed_inserts = 0
-    for url in insert_urls:
-        failed_inserts += not filter.add(url)
+    # add URLs to the filter and query them back; the Bloom filter
+    # has a batch version of add, and both filters one of check,
+    # which do the same as the single item calls
+    if isinstance(filter, BloomFilter):
+        failed_inserts = len(insert_urls) - filter.add_many(insert_urls)
+    else:
+        failed_inserts = 0
+        for url in insert_urls:
+            failed_inserts += not filter.add(url)
+
+    preds = filter.check_many(query_urls)
 
     fp = 0
 
-    for url in query_urls:
-        pred = filter.check(url)
-        gt = url in ground_truth
-
-        if pred and not gt:
+    for url, pred in zip(query_urls, preds):
+        if pred and url not in ground_truth:
             fp += 1
 
     fp_rate = round(fp / len(query_urls), 10)
@@ -126,6 +130,7 @@ def main():
                     n,
                     expected_fp_rate,
                     *test_filter(bf, insert_urls, query_urls, containment_ground_truth),
+                    round(bf.fill_ratio(), 5),
                 ]
             )
 
@@ -142,6 +147,7 @@ def main():
                 "Q U GT",
                 "FP (max)",
                 "FP-rate (max)",
+                "Fill ratio",
             ],
         )
     )
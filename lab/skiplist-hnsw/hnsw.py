@@ -1,23 +1,24 @@
+import heapq
 import math
 import random
-from collections import deque
-from typing import Any, Callable, List, Optional, Set
+from collections import defaultdict, deque
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 # for replicability
 random.seed(130397)
 
+_node_ids = count()
+
 
 class GraphNode:
     def __init__(self, item: Optional[Any], level: int = 0) -> None:
         self.item: Optional[Any] = item
         self.level: int = level
+        self.id: int = next(_node_ids)
 
-        # In this way we do not consider a proper
-        # semantic for incoming/outgoing edges on the node
-        self.neighbors: List[Set[Any]] = [set() for _ in range(level + 1)]
-
-    def __hash__(self) -> int:
-        return hash(self.item)
+    # no __hash__ / __eq__: nodes are interned, one per inserted item, so
+    # the default identity ones are right, and they do not call into Python
 
 
 def basic_distance(a: GraphNode, b: GraphNode):
@@ -45,72 +46,105 @@ class HNSW:
 
         self.level = 0
 
-        # a different solution might involve to keep
-        # all the nodes in some data structure like a set
-        # or a dictionary of sets
-        #
-        # self._layers = defaultdict(set)
+        # number of nodes inserted so far, which sizes the batches of insert_batch
+        self._num_nodes = 0
+
+        # the links of all the nodes, keyed by (layer, node id), instead of
+        # a list of sets on each node: one dict rather than a list per node.
+        # In this way we do not consider a proper
+        # semantic for incoming/outgoing edges on the node
+        self._adj: Dict[Tuple[int, int], Set[GraphNode]] = defaultdict(set)
 
         # entrance point
         self.ep: Optional[GraphNode] = GraphNode(None, self.level)
 
     def _random_level(self):
         return math.floor(
-            -math.log(random.random(), math.e) * self.normalization_factor
+            -math.log(random.random()) * self.normalization_factor
         )
 
-    def _nearest(self, q: GraphNode, points: Set[GraphNode]) -> GraphNode:
-        return min(points, key=lambda w: self.distance(q, w))
+    def _random_levels(self, n: int) -> List[int]:
+        """
+        The levels of the next n nodes, as n calls to _random_level would
+        draw them, without the method call for each.
+        """
+        floor, log, rand = math.floor, math.log, random.random
+        m_l = self.normalization_factor
+        return [floor(-log(rand()) * m_l) for _ in range(n)]
 
-    def _furthest(self, q: GraphNode, points: Set[GraphNode]) -> GraphNode:
-        return max(points, key=lambda w: self.distance(q, w))
+    def _distance_to(self, q: GraphNode) -> Callable[[GraphNode], float]:
+        """
+        Return the distance to q as a function of the other node, memoized
+        for the duration of one insert or knn: the closest nodes are met by
+        the search on every layer, then sorted again to pick the neighbors.
+        With the default basic_distance, the distance is computed inline
+        rather than through a call for each node.
+        """
+        distance = self.distance
+        cache: Dict[GraphNode, float] = {}
+
+        if distance is basic_distance and q.item is not None:
+            q_item = q.item
+
+            def basic_distance_to_q(node: GraphNode) -> float:
+                d = cache.get(node)
+                if d is None:
+                    item = node.item
+                    d = cache[node] = (
+                        abs(q_item - item) if item is not None else float("inf")
+                    )
+                return d
 
-    def insert(self, q: Any):
-        W = set()
+            return basic_distance_to_q
 
-        layer_i = self._random_level()
-        L = self.level
-        q = GraphNode(q, layer_i)
+        def distance_to_q(node: GraphNode) -> float:
+            d = cache.get(node)
+            if d is None:
+                d = cache[node] = distance(q, node)
+            return d
 
-        ep = {self.ep}
+        return distance_to_q
 
-        # first phase: descend down to the last layer
-        # where the new item is not present
-        for lc in range(L, min(L, layer_i), -1):
-            W = self.search_layer(q, ep, lc, ef=1)
-            ep = {self._nearest(q, W)}
+    def _node_neighbors(self, node: GraphNode) -> List[Set[GraphNode]]:
+        """
+        The neighbors of node, one set per layer from the lowest one.
+        """
+        return [self._adj.get((lc, node.id), set()) for lc in range(node.level + 1)]
 
-        # Now, we have to add the node on each layer
-        # to the lowest one
-        for lc in range(min(L, layer_i), -1, -1):
-            if self.ep.item is None:
-                continue
+    def _nearest(
+        self,
+        q: GraphNode,
+        points: Set[GraphNode],
+        distance_to_q: Optional[Callable[[GraphNode], float]] = None,
+    ) -> GraphNode:
+        return min(points, key=distance_to_q or (lambda w: self.distance(q, w)))
+
+    def insert(self, q: Any):
+        layer_i = self._random_level()
+        L = self.level
+        q = GraphNode(q, layer_i)
+        self._num_nodes += 1
+        adj = self._adj
 
+        for lc, neighbors in self._search_neighbors(q, self._distance_to(q)):
             # select the number of connections
             # typically at lowest level more connections are allowed
             M = self.max_connections if lc > 0 else self.max_connections_lowest
 
-            W = self.search_layer(q, ep, lc, ef=self.ef_construction)
-
-            if not W:
-                continue
-
-            neighbors = self.select_neighbors_simple(q=q, candidates=W, k=M)
-            assert len(neighbors) <= M
-
             # Update the connections, for the new node
             # and for its neighbors too
-            q.neighbors[lc] = neighbors
+            adj[(lc, q.id)] = neighbors
             for e in neighbors:
-                e.neighbors[lc].add(q)
+                e_neighbors = adj[(lc, e.id)]
+                e_neighbors.add(q)
 
                 # If now a node has more than ef_construction
                 # links, we have to shrink them
-                if len(e.neighbors[lc]) > M:
-                    e.neighbors[lc] = self.select_neighbors_simple(
-                        q=e, candidates=e.neighbors[lc], k=M
+                if len(e_neighbors) > M:
+                    e_neighbors = adj[(lc, e.id)] = self.select_neighbors_simple(
+                        q=e, candidates=e_neighbors, k=M
                     )
-                    assert len(e.neighbors[lc]) <= M
+                    assert len(e_neighbors) <= M
 
                     # It's possible that by shrinking this node's neighbors,
                     # the new node we were trying to connect will be discarded.
@@ -119,97 +153,231 @@ class HNSW:
                     #
                     # assert q in e.neighbors[lc]
 
-            ep = W
-
-        if ep is None or layer_i > L:
+        if layer_i > L:
             self.level = layer_i
             self.ep = q
             if self.verbose:
-                print(self.ep.neighbors)
+                print(self._node_neighbors(self.ep))
                 print(f"Update: ep-->{self.ep}, current level-->{self.level}")
 
+    def insert_batch(self, items: Iterable[Any]):
+        """
+        Insert several items, in batches of doubling size.
+
+        As in ParlayANN's batch construction, the items of a batch first
+        search the graph as it was before the batch, without changing it;
+        only then their links are added, and each existing node that got
+        new links is shrunk back to M once per batch, instead of once per
+        new link. The items of a batch are not searched against each other,
+        so each batch is only as large as the graph it searches (the nodes
+        inserted before it, by this call or earlier ones). The first items
+        go through insert, until the graph has an entry point.
+        """
+        items = list(items)
+
+        start = 0
+        while start < len(items) and self.ep.item is None:
+            self.insert(items[start])
+            start += 1
+
+        # the levels of all the batches, drawn at once
+        levels = self._random_levels(len(items) - start)
+        offset = start
+
+        while start < len(items):
+            size = max(self._num_nodes, 1)
+            batch = items[start : start + size]
+            batch_levels = levels[start - offset : start - offset + len(batch)]
+            start += len(batch)
+            self._num_nodes += len(batch)
+
+            L = self.level
+            nodes = [GraphNode(item, lv) for item, lv in zip(batch, batch_levels)]
+
+            # first phase: all the searches, on the same graph
+            links = [(q, self._search_neighbors(q, self._distance_to(q))) for q in nodes]
+
+            # second phase: add the links, then shrink the nodes that got too many
+            adj = self._adj
+            grown: Dict[Tuple[int, int], GraphNode] = {}
+            for q, layer_neighbors in links:
+                for lc, neighbors in layer_neighbors:
+                    adj[(lc, q.id)] = neighbors
+                    for e in neighbors:
+                        adj[(lc, e.id)].add(q)
+                        grown[(lc, e.id)] = e
+
+            for key, e in grown.items():
+                lc = key[0]
+                M = self.max_connections if lc > 0 else self.max_connections_lowest
+                if len(adj[key]) > M:
+                    adj[key] = self.select_neighbors_simple(q=e, candidates=adj[key], k=M)
+
+            top = max(nodes, key=lambda n: n.level)
+            if top.level > L:
+                self.level = top.level
+                self.ep = top
+
+    def _search_neighbors(
+        self, q: GraphNode, distance_to_q: Callable[[GraphNode], float]
+    ) -> List[Tuple[int, Set[GraphNode]]]:
+        """
+        Select the neighbors of the new node q on each of its layers, from
+        the highest one, without changing the graph. Each search only reads
+        the links of its own layer, so linking q afterwards gives the same
+        graph as linking it layer by layer.
+        """
+        L = self.level
+        ep = {self.ep}
+
+        # first phase: descend down to the last layer
+        # where the new item is not present
+        for lc in range(L, min(L, q.level), -1):
+            W = self.search_layer(q, ep, lc, ef=1, distance_to_q=distance_to_q)
+            ep = {self._nearest(q, W, distance_to_q)}
+
+        # Now, we have to find the neighbors of the node
+        # on each layer to the lowest one
+        layer_neighbors = []
+        for lc in range(min(L, q.level), -1, -1):
+            if self.ep.item is None:
+                continue
+
+            M = self.max_connections if lc > 0 else self.max_connections_lowest
+
+            W = self.search_layer(
+                q, ep, lc, ef=self.ef_construction, distance_to_q=distance_to_q
+            )
+
+            if not W:
+                continue
+
+            neighbors = self.select_neighbors_simple(
+                q=q, candidates=W, k=M, distance_to_q=distance_to_q
+            )
+            assert len(neighbors) <= M
+
+            layer_neighbors.append((lc, neighbors))
+            ep = W
+
+        return layer_neighbors
+
     def select_neighbors_simple(
-        self, q: GraphNode, candidates: Set[GraphNode], k: int, *args
+        self,
+        q: GraphNode,
+        candidates: Set[GraphNode],
+        k: int,
+        *args,
+        distance_to_q: Optional[Callable[[GraphNode], float]] = None,
     ) -> Set[GraphNode]:
         """
         The simplest selection method
         """
-        candidates = {c for c in candidates if c.item != q.item}
+        candidates = [c for c in candidates if c.item != q.item]
+        if len(candidates) <= k:
+            # all of them are selected, there is nothing to sort
+            return set(candidates)
+
+        key = distance_to_q or (lambda c: self.distance(q, c))
 
-        return set(sorted(candidates, key=lambda c: self.distance(q, c))[:k])
+        return set(sorted(candidates, key=key)[:k])
 
-    def search_layer(self, q: GraphNode, ep: Set[GraphNode], level: int, ef: int):
+    def search_layer(
+        self,
+        q: GraphNode,
+        ep: Set[GraphNode],
+        level: int,
+        ef: int,
+        distance_to_q: Optional[Callable[[GraphNode], float]] = None,
+    ):
         """
         Searches for nearest neighboors to the query on the specified layer.
+
+        The candidates are kept in a min-heap and the nearest neighbors in
+        a max-heap (with negated distances), so that the nearest candidate
+        and the furthest neighbor are found without scanning the whole sets.
+        Heap entries are (distance, counter, node): the distance of a node is
+        computed once, and the counter breaks ties, as nodes do not compare.
+        distance_to_q can be given to share distances across calls (see
+        _distance_to).
         """
+        distance_to_q = distance_to_q or (lambda e: self.distance(q, e))
+        adj = self._adj
+        counter = count()
         visited: Set[GraphNode] = set(ep)
-        candidates: Set[GraphNode] = set(ep)
-        nearest_n: Set[GraphNode] = set(ep)
+        candidates = []
+        nearest_n = []
 
-        while candidates:
-            nearest = self._nearest(q, candidates)
-            candidates.remove(nearest)
+        for e in ep:
+            d = distance_to_q(e)
+            c = next(counter)
+            candidates.append((d, c, e))
+            nearest_n.append((-d, c, e))
 
-            furthest = self._furthest(q, nearest_n)
+        heapq.heapify(candidates)
+        heapq.heapify(nearest_n)
+
+        while candidates:
+            d_nearest, _, nearest = heapq.heappop(candidates)
 
-            if self.distance(q, nearest) > self.distance(q, furthest):
+            # the distance of the furthest neighbor
+            if d_nearest > -nearest_n[0][0]:
                 break
 
-            for e in nearest.neighbors[level]:
+            for e in adj.get((level, nearest.id), ()):
                 if e not in visited:
                     visited.add(e)
 
-                    furthest = self._furthest(q, nearest_n)
+                    d = distance_to_q(e)
 
-                    if (
-                        self.distance(q, e) < self.distance(q, furthest)
-                        or len(nearest_n) < ef
-                    ):
-                        candidates.add(e)
-                        nearest_n.add(e)
+                    if d < -nearest_n[0][0] or len(nearest_n) < ef:
+                        c = next(counter)
+                        heapq.heappush(candidates, (d, c, e))
 
-                        if len(nearest_n) > ef:
-                            nearest_n.remove(self._furthest(q, nearest_n))
+                        # once there are ef neighbors, adding one
+                        # means dropping the furthest
+                        if len(nearest_n) < ef:
+                            heapq.heappush(nearest_n, (-d, c, e))
+                        else:
+                            heapq.heappushpop(nearest_n, (-d, c, e))
 
-        return nearest_n
+        return {e for _, _, e in nearest_n}
 
     def knn(self, q: GraphNode, k: int, ef: int) -> List[Any]:
         W = set()
 
         ep = self.ep
+        distance_to_q = self._distance_to(q)
 
         for lc in range(self.level, 0, -1):
-            W = self.search_layer(q, {ep}, lc, ef=1)
-            ep = self._nearest(q, W)
+            W = self.search_layer(q, {ep}, lc, ef=1, distance_to_q=distance_to_q)
+            ep = self._nearest(q, W, distance_to_q)
 
-        W = self.search_layer(q, {ep}, level=0, ef=ef)
-        results = self.select_neighbors_simple(q, W, k)
+        W = self.search_layer(q, {ep}, level=0, ef=ef, distance_to_q=distance_to_q)
+        results = self.select_neighbors_simple(q, W, k, distance_to_q=distance_to_q)
         results = [n.item for n in results]
         return results
 
     def traverse_hnsw_graph(self) -> List[GraphNode]:
         """
         Traverse the entire HNSW graph from a given entry point using BFS.
+
+        Nodes are marked as visited when queued, so that each of them
+        is queued once, however many of the visited nodes link to it.
         """
-        visited = set()
+        visited = {self.ep.item}
         queue = deque([self.ep])
         traversal_order = []
 
         while queue:
             current_node = queue.popleft()
-
-            # Skip if already visited
-            if current_node.item in visited:
-                continue
-
-            # Mark as visited and add to traversal order
-            visited.add(current_node.item)
             traversal_order.append(current_node)
 
             # Explore neighbors at all layers of the current node
-            for layer in range(len(current_node.neighbors)):
-                for neighbor in current_node.neighbors[layer]:
-                    if neighbor not in visited:
+            for layer_neighbors in self._node_neighbors(current_node):
+                for neighbor in layer_neighbors:
+                    if neighbor.item not in visited:
+                        visited.add(neighbor.item)
                         queue.append(neighbor)
 
         return traversal_order
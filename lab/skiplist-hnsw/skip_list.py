@@ -31,12 +31,12 @@ class SkipList:
 
         return level
 
-    def _compare_keys(self, k1: int, k2: int) -> int:
-        if k1 is None or k2 is None:
-            return -1 if k1 is None else 1
-        return (k1 > k2) - (k1 < k2)
-
     def search(self, q) -> Optional[int]:
+        # only the header has no item, and it is never a successor:
+        # the items in the lists can be compared to q directly
+        if q is None:
+            return None
+
         current = self._header
 
         # Starting from the highest level, we go down
@@ -44,19 +44,21 @@ class SkipList:
         for level in range(self.max_level, -1, -1):
             # current.forward[level] gives us the access to the
             # next node at the same current level (horizontal move)
-            while (
-                current.forward[level] is not None
-                and self._compare_keys(current.forward[level].item, q) < 0
-            ):
-                current = current.forward[level]
+            successor = current.forward[level]
+            while successor is not None and successor.item < q:
+                current = successor
+                successor = current.forward[level]
 
         current = current.forward[0]
 
-        if current is not None and self._compare_keys(current.item, q) == 0:
+        if current is not None and current.item == q:
             return current.item
         return None
 
     def insert(self, q: int) -> None:
+        if q is None:
+            raise ValueError("None cannot be inserted, it is the header's item")
+
         current = self._header
 
         # at each level we will need to update
@@ -67,14 +69,15 @@ class SkipList:
         # the current level is not set to self.max_level,
         # since a less number of layers might be used at this stage
         for level in range(self.level, -1, -1):
-            while (
-                current.forward[level] is not None
-                and self._compare_keys(current.forward[level].item, q) < 0
-            ):
-                current = current.forward[level]
+            successor = current.forward[level]
+            while successor is not None and successor.item < q:
+                current = successor
+                successor = current.forward[level]
             update[level] = current
 
-        if current is not None and self._compare_keys(current.item, q) == 0:
+        # current precedes q, so q is already there if it follows current
+        successor = current.forward[0]
+        if successor is not None and successor.item == q:
             return
 
         new_level = self._random_level()
@@ -0,0 +1,51 @@
+import math
+import random
+
+from hnsw import HNSW, GraphNode
+
+
+def _index() -> HNSW:
+    M = 10
+    return HNSW(
+        max_connections=M,
+        max_connections_lowest=2 * M,
+        ef_construction=16,
+        normalization_factor=1 / math.log(M),
+    )
+
+
+def _check_index(index: HNSW, items):
+    # like a sequential build, a few nodes may end up unreachable
+    reached = {n.item for n in index.traverse_hnsw_graph()}
+    assert len(reached & set(items)) >= 0.95 * len(items)
+
+    # knn leaves out a node with the query's item, so query between items
+    hits = 0
+    queries = [q + 0.5 for q in random.sample(items, 20)]
+    for q in queries:
+        truth = sorted(items, key=lambda x: abs(q - x))[:5]
+        hits += len(set(index.knn(GraphNode(q), 5, ef=16)) & set(truth))
+    assert hits >= 0.9 * 5 * len(queries)
+
+
+def test_insert_batch_twice():
+    random.seed(0)
+    items = random.sample(range(10**6), 600)
+
+    index = _index()
+    index.insert_batch(items[:400])
+    index.insert_batch(items[400:])
+
+    _check_index(index, items)
+
+
+def test_insert_batch_after_insert():
+    random.seed(1)
+    items = random.sample(range(10**6), 300)
+
+    index = _index()
+    for q in items[:50]:
+        index.insert(q)
+    index.insert_batch(items[50:])
+
+    _check_index(index, items)